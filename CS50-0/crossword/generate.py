@@ -48,40 +48,37 @@ class CrosswordCreator():
         """
         Save crossword assignment to an image file.
         """
+        import numpy as np
         from PIL import Image, ImageDraw, ImageFont
         cell_size = 100
         cell_border = 2
         interior_size = cell_size - 2 * cell_border
         letters = self.letter_grid(assignment)
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
+        # Fill the white square inside each open cell's border, as one array
+        open_cells = np.array(self.crossword.structure, dtype=bool)
+        pixels = np.zeros(
+            (self.crossword.height, cell_size, self.crossword.width, cell_size, 4), dtype=np.uint8
         )
+        pixels[..., 3] = 255
+        inside = slice(cell_border, cell_size - cell_border + 1)
+        pixels[:, inside, :, inside, :3] = 255 * open_cells[:, None, :, None, None]
+        img = Image.fromarray(pixels.reshape(
+            self.crossword.height * cell_size, self.crossword.width * cell_size, 4
+        ), "RGBA")
+
+        # Only the letters still need drawing one at a time
         font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
         draw = ImageDraw.Draw(img)
-
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        _, _, w, h = draw.textbbox((0, 0), letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
+                if self.crossword.structure[i][j] and letters[i][j]:
+                    _, _, w, h = draw.textbbox((0, 0), letters[i][j], font=font)
+                    draw.text(
+                        (j * cell_size + cell_border + ((interior_size - w) / 2),
+                         i * cell_size + cell_border + ((interior_size - h) / 2) - 10),
+                        letters[i][j], fill="black", font=font
+                    )
 
         img.save(filename)
 
@@ -0,0 +1,184 @@
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+import degrees
+
+# Search modes the benchmark can run, mapped to the find_path arguments they use
+MODES = {
+    "bfs": {"bidirectional": False},
+    "bidirectional": {"bidirectional": True},
+    "landmarks": {"bidirectional": False, "guided": True},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees.py on synthetic datasets.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic dataset")
+    generate.add_argument("directory")
+    generate.add_argument("--people", type=int, default=10000)
+    generate.add_argument("--movies", type=int, default=5000)
+    generate.add_argument("--cast-exponent", type=float, default=1.8,
+                          help="Pareto shape of the cast size distribution")
+    generate.add_argument("--min-cast", type=int, default=3)
+    generate.add_argument("--max-cast", type=int, default=60)
+    generate.add_argument("--popularity-exponent", type=float, default=0.8,
+                          help="Zipf exponent of how often each person is cast")
+    generate.add_argument("--pairs", type=int, default=50,
+                          help="number of fixed query pairs to write to pairs.tsv")
+    generate.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("run", help="time loading and querying a dataset")
+    run.add_argument("directory")
+    run.add_argument("--modes", nargs="+", choices=list(MODES), default=["bfs", "bidirectional"])
+    run.add_argument("--landmarks", type=int, default=16)
+    run.add_argument("--costars", action="store_true", help="query with the co-star index")
+    run.add_argument("--snapshot", action="store_true", help="load through the snapshot cache")
+    run.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate_dataset(
+            args.directory, args.people, args.movies, args.cast_exponent, args.min_cast,
+            args.max_cast, args.popularity_exponent, args.pairs, args.seed
+        )
+    else:
+        report = run_benchmark(
+            args.directory, args.modes, args.landmarks, args.costars, args.snapshot
+        )
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+
+
+def generate_dataset(directory, people, movies, cast_exponent=1.8, min_cast=3, max_cast=60,
+                     popularity_exponent=0.8, pairs=50, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv in the degrees format, with power-law cast
+    sizes and Zipf-distributed popularity so a few people appear in many movies, plus a
+    pairs.tsv of fixed query pairs.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            writer.writerow([person + 1, f"Person {person + 1}", 1900 + rng.randrange(110)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies):
+            writer.writerow([movie + 1, f"Movie {movie + 1}", 1920 + rng.randrange(100)])
+
+    # Cumulative Zipf weights, shuffled so popularity is unrelated to id order
+    ranks = list(range(people))
+    rng.shuffle(ranks)
+    cumulative = []
+    total = 0
+    for person in range(people):
+        total += (ranks[person] + 1) ** -popularity_exponent
+        cumulative.append(total)
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            size = min(max_cast, int(min_cast * rng.paretovariate(cast_exponent)))
+            cast = set(rng.choices(range(people), cum_weights=cumulative, k=size))
+            for person in sorted(cast):
+                writer.writerow([person + 1, movie + 1])
+
+    with open(os.path.join(directory, "pairs.tsv"), "w", encoding="utf-8") as f:
+        for _ in range(pairs):
+            f.write(f"{rng.randrange(people) + 1}\t{rng.randrange(people) + 1}\n")
+
+
+def run_benchmark(directory, modes, landmarks=16, costars=False, snapshot=False):
+    """
+    Load a dataset and answer its fixed query pairs in each mode, returning a report of load
+    time, peak RSS, and per-query latency and states explored.
+    """
+    report = {"directory": directory, "snapshot": snapshot, "costars": costars}
+
+    started = time.perf_counter()
+    degrees.load_data(directory, use_snapshot=snapshot)
+    report["load_seconds"] = time.perf_counter() - started
+    report["people"] = len(degrees.graph.person_ids)
+    report["movies"] = len(degrees.graph.movie_ids)
+    report["credits"] = len(degrees.graph.person_movies)
+    report["graph_bytes"] = degrees.graph.nbytes()
+
+    if costars:
+        started = time.perf_counter()
+        degrees.load_costars(directory, use_snapshot=snapshot)
+        report["costar_seconds"] = time.perf_counter() - started
+        report["costar_bytes"] = degrees.graph.costar_nbytes()
+
+    pairsPath = os.path.join(directory, "pairs.tsv")
+    with open(pairsPath, encoding="utf-8") as f:
+        pairs = list(degrees.parse_pairs(f))
+
+    report["modes"] = {}
+    for mode in modes:
+        degrees.oracle = None
+        if mode == "landmarks":
+            started = time.perf_counter()
+            degrees.load_landmarks(directory, landmarks, use_snapshot=snapshot)
+            setup = time.perf_counter() - started
+        else:
+            setup = 0.0
+
+        queries = []
+        for source, target in pairs:
+            started = time.perf_counter()
+            path = degrees.find_path(source, target, **MODES[mode])
+            queries.append({
+                "source": source,
+                "target": target,
+                "degrees": None if path is None else len(path),
+                "seconds": time.perf_counter() - started,
+                "explored": sum(degrees.searchStats.values()),
+            })
+        report["modes"][mode] = {
+            "setup_seconds": setup,
+            "summary": summarize(queries),
+            "queries": queries,
+        }
+
+    report["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def summarize(queries):
+    """
+    Return latency percentiles and explored-state totals over a list of query results.
+    """
+    if not queries:
+        return {}
+    latencies = sorted(query["seconds"] for query in queries)
+    return {
+        "queries": len(queries),
+        "total_seconds": sum(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, len(latencies) * 95 // 100)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "explored": sum(query["explored"] for query in queries),
+    }
+
+
+if __name__ == "__main__":
+    main()
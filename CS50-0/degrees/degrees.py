@@ -1,67 +1,211 @@
-import csv
+import argparse
+import heapq
+import json
+import math
+import multiprocessing
+import os
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import Graph, MoviesView, NamesView, PeopleView, snapshot_key
+from landmarks import LandmarkOracle
+from util import Node, StackFrontier, QueueFrontier, DequeQueueFrontier
+
+# Compact integer-indexed person-movie graph backing the lookups below
+graph = Graph()
 
 # Maps names to a set of corresponding person_ids
-names = {}
+names = NamesView(graph)
 
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+people = PeopleView(graph)
 
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+movies = MoviesView(graph)
+
+# Counts of states explored by the most recent search
+searchStats = {}
+
+# Frontier classes used by default in each search, switchable from the command line
+frontierTypes = {"shortest_path": DequeQueueFrontier}
+
+# Optional landmark distance oracle used for bounds, and to guide the search on request
+oracle = None
+
+
+# Name of the binary snapshot written next to a dataset's CSV files
+SNAPSHOT = ".degrees.snapshot"
+
+# Name of the landmark distance file written next to a dataset's CSV files
+LANDMARKS = ".degrees.landmarks"
+
+# Name of the co-star adjacency index written next to a dataset's CSV files
+COSTARS = ".degrees.costars"
 
 
-def load_data(directory):
+def load_data(directory, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    If `use_snapshot` is set, a snapshot matching the CSV files is loaded instead when one
+    exists, and a fresh snapshot is written after parsing the CSV files otherwise.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    snapshot = os.path.join(directory, SNAPSHOT)
+    if use_snapshot:
+        key = snapshot_key(directory)
+        try:
+            graph.load_snapshot(snapshot, key)
+            return
+        except (OSError, ValueError):
+            pass
+
+    graph.load_csv(directory)
+
+    if use_snapshot:
+        try:
+            graph.save_snapshot(snapshot, key)
+        except (OSError, ValueError):
+            pass
+
+
+def apply_updates(directory):
+    """
+    Appends the people, movies and star credits in a directory of CSV files to the loaded
+    graph without reloading it. The co-star index and landmark distances become stale and
+    are dropped. Returns the number of people, movies and credits added.
+    """
+    added = graph.load_updates(directory)
+    fresh_oracle()
+    return added
+
+
+def fresh_oracle():
+    """
+    Returns the landmark oracle if it still describes the graph, dropping it otherwise.
+    """
+    global oracle
+    if oracle is not None and not oracle.is_current():
+        oracle = None
+    return oracle
+
+
+def load_costars(directory, workers=1, use_snapshot=True):
+    """
+    Build (or, if `use_snapshot` is set, reuse) the collapsed co-star adjacency index, so
+    searches expand each person with a single array slice. Cached indexes are only used
+    for a graph that has not been updated since it was loaded.
+    """
+    path = os.path.join(directory, COSTARS)
+    key = snapshot_key(directory)
+    use_snapshot = use_snapshot and graph.version == 0
+    if use_snapshot:
+        try:
+            graph.load_costar_index(path, key)
+            return
+        except (OSError, ValueError):
+            pass
+
+    graph.build_costar_index(workers)
+
+    if use_snapshot:
+        try:
+            graph.save_costar_index(path, key)
+        except OSError:
+            pass
+
+
+def load_landmarks(directory, count, use_snapshot=True):
+    """
+    Precompute (or, if `use_snapshot` is set, reuse) distances from `count` landmark people
+    and install them as the oracle used by find_path and degrees_of_separation. Cached
+    distances are only used for a graph that has not been updated since it was loaded.
+    """
+    global oracle
+    path = os.path.join(directory, LANDMARKS)
+    key = [snapshot_key(directory), count]
+    use_snapshot = use_snapshot and graph.version == 0
+    if use_snapshot:
+        try:
+            oracle = LandmarkOracle.load(graph, path, key)
+            return
+        except (OSError, ValueError):
+            pass
+
+    oracle = LandmarkOracle.build(graph, count)
+
+    if use_snapshot:
+        try:
+            oracle.save(path, key)
+        except OSError:
+            pass
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory] [options]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both the source and the target")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the number of states explored")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files and do not write a snapshot")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab- or comma-separated name/ID pairs from FILE ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes for --batch and --serve")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="answer HTTP queries on PORT instead of prompting")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on with --serve")
+    parser.add_argument("--updates", metavar="DIR", action="append", default=[],
+                        help="append the people, movies and stars CSV files in DIR after loading")
+    parser.add_argument("--costars", action="store_true",
+                        help="build or load the collapsed co-star adjacency index")
+    parser.add_argument("--landmarks", type=int, metavar="K", default=0,
+                        help="precompute distances from K landmark people to bound searches")
+    parser.add_argument("--guided", action="store_true",
+                        help="search with A* over the landmark bounds (needs --landmarks)")
+    parser.add_argument("--frontier", choices=["deque", "list"], default="deque",
+                        help="frontier used by the one-sided search")
+    parser.add_argument("--degrees-only", action="store_true",
+                        help="print only the degrees of separation")
+    args = parser.parse_args()
+    directory = args.directory
 #    directory = "/Users/dsparks/Github/Projects/CS50-0/degrees/large"
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    # Load data from files into memory, keeping stdout clean for batch results
+    log = sys.stderr if args.batch or args.serve else sys.stdout
+    print("Loading data...", file=log)
+    load_data(directory, use_snapshot=not args.no_snapshot)
+    print("Data loaded.", file=log)
+    for updates in args.updates:
+        added = apply_updates(updates)
+        print(f"Applied {updates}: {added[0]} people, {added[1]} movies, {added[2]} credits.",
+              file=log)
+    if args.costars:
+        print("Indexing co-stars...", file=log)
+        load_costars(directory, args.workers, use_snapshot=not args.no_snapshot)
+        print(f"Co-star index ready ({graph.costar_nbytes()} bytes, "
+              f"graph {graph.nbytes()} bytes).", file=log)
+    if args.frontier == "list":
+        frontierTypes["shortest_path"] = QueueFrontier
+    if args.landmarks:
+        print("Computing landmarks...", file=log)
+        load_landmarks(directory, args.landmarks, use_snapshot=not args.no_snapshot)
+        print(f"Landmarks ready ({oracle.nbytes()} bytes).", file=log)
+
+    if args.serve:
+        from server import serve
+        serve(service_query, args.host, args.serve, args.workers)
+        return
+
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, args.workers, args.bidirectional)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, args.workers, args.bidirectional)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -70,7 +214,18 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.degrees_only:
+        degrees = degrees_of_separation(source, target)
+        if args.stats:
+            for side, count in searchStats.items():
+                print(f"States explored ({side}): {count}")
+        print("no path" if degrees is None else f"{degrees} degrees of separation.")
+        return
+
+    path = find_path(source, target, args.bidirectional, args.guided)
+    if args.stats:
+        for side, count in searchStats.items():
+            print(f"States explored ({side}): {count}")
 
     if path is None:
         print("no path")
@@ -84,19 +239,173 @@ def main():
             movie = movies[path[i + 1][0]]["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
-def shortest_path(source, target):
+def run_batch(lines, workers, bidirectional=False, output=sys.stdout):
+    """
+    Answers every name or ID pair in `lines` across a pool of forked worker processes, which
+    share the loaded graph copy-on-write. Results are written as JSON lines in completion
+    order, followed by throughput statistics on stderr.
+    """
+    tasks = [
+        (number, source, target, bidirectional)
+        for number, (source, target) in enumerate(parse_pairs(lines), 1)
+    ]
+
+    started = time.perf_counter()
+    latencies = []
+    errors = 0
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pool = multiprocessing.get_context("fork").Pool(workers)
+        results = pool.imap_unordered(batch_query, tasks, chunksize=4)
+    else:
+        pool = None
+        results = map(batch_query, tasks)
+    try:
+        for result in results:
+            latencies.append(result["seconds"])
+            errors += "error" in result
+            print(json.dumps(result), file=output, flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Queries: {len(latencies)} ({errors} errors) in {elapsed:.3f}s", file=sys.stderr)
+    if latencies:
+        print(f"Throughput: {len(latencies) / elapsed:.1f} queries/s", file=sys.stderr)
+        print(f"Latency: mean {sum(latencies) / len(latencies) * 1000:.2f}ms, "
+              f"median {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+              f"max {latencies[-1] * 1000:.2f}ms", file=sys.stderr)
+
+def parse_pairs(lines):
+    """
+    Yields (source, target) pairs from lines separated by a tab or, failing that, a comma.
+    Blank lines and lines starting with # are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        separator = "\t" if "\t" in line else ","
+        source, _, target = line.partition(separator)
+        yield source.strip(), target.strip()
+
+def batch_query(task):
+    """
+    Resolves and answers one batch pair, returning a JSON-serializable result
+    """
+    lineNumber, sourceName, targetName, bidirectional = task
+    started = time.perf_counter()
+    result = {"line": lineNumber, "source": sourceName, "target": targetName}
+    try:
+        source = resolve_person(sourceName)
+        target = resolve_person(targetName)
+        path = find_path(source, target, bidirectional)
+        result["source_id"] = source
+        result["target_id"] = target
+        result["degrees"] = None if path is None else len(path)
+        result["path"] = path
+        result["explored"] = dict(searchStats)
+    except LookupError as e:
+        result["error"] = e.args[0]
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def service_query(task):
+    """
+    Answers one (kind, source, target) query for the HTTP service, where kind is "path" for the
+    full path or "degrees" for the degree count alone
+    """
+    kind, sourceName, targetName = task
+    if kind == "path":
+        result = batch_query((None, sourceName, targetName, False))
+        del result["line"]
+        return result
+
+    started = time.perf_counter()
+    result = {"source": sourceName, "target": targetName}
+    try:
+        source = resolve_person(sourceName)
+        target = resolve_person(targetName)
+        result["source_id"] = source
+        result["target_id"] = target
+        result["degrees"] = degrees_of_separation(source, target)
+        result["explored"] = dict(searchStats)
+    except LookupError as e:
+        result["error"] = e.args[0]
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def resolve_person(name):
+    """
+    Returns the IMDB id for an IMDB id or an unambiguous name, without prompting.
+
+    Raises LookupError if the name is unknown or ambiguous.
+    """
+    if name in people:
+        return name
+    person_ids = names.get(name.lower(), set()) or suggest_person_ids(name)
+    if len(person_ids) != 1:
+        problem = "ambiguous" if person_ids else "not found"
+        raise LookupError(f"{name!r} is {problem}")
+    return next(iter(person_ids))
+
+def find_path(source, target, bidirectional=False, guided=False):
+    """
+    Returns the shortest path between two people using the requested search.
+
+    A loaded landmark oracle answers disconnected pairs without searching, and with `guided`
+    set the search is A* over its bounds. Plain breadth-first search stays the default: the
+    A* expands fewer people but costs more per person, so it is slower overall in Python.
+    """
+    if fresh_oracle() is not None:
+        if guided:
+            return landmark_shortest_path(source, target)
+        if oracle.bounds(graph.person_index[source], graph.person_index[target])[0] == math.inf:
+            searchStats.clear()
+            searchStats["total"] = 0
+            return None
+    if bidirectional:
+        return bidirectional_shortest_path(source, target)
+    return shortest_path(source, target)
+
+def degrees_of_separation(source, target):
+    """
+    Returns the number of degrees between two people, or None if they are not connected.
+
+    When the landmark bounds already agree, no search is needed.
+    """
+    searchStats.clear()
+    if fresh_oracle() is not None:
+        lower, upper = oracle.bounds(graph.person_index[source], graph.person_index[target])
+        if lower == math.inf:
+            return None
+        if lower == upper:
+            return lower
+    path = find_path(source, target)
+    return None if path is None else len(path)
+
+def shortest_path(source, target, frontier_type=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs that connect the source to the target.
+    `frontier_type` is the queue frontier class to search with, DequeQueueFrontier by default.
 
     If no possible path, returns None.
     """
 
     # Keep track of number of states explored
     numExplored = 0
+    searchStats.clear()
+    searchStats["total"] = 0
+
+    # Search over dense person indices rather than IMDB ids
+    source = graph.person_index[source]
+    target = graph.person_index[target]
 
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = (frontier_type or frontierTypes["shortest_path"])()
     frontier.add(start)
 
     # Initialize an empty explored set
@@ -112,22 +421,148 @@ def shortest_path(source, target):
         # Choose a node from the frontier
         node = frontier.remove()
         numExplored += 1
+        searchStats["total"] = numExplored
 
         # If node is the goal, then we have a solution
         if node.state == target:
-            return WalkPath (node)
+            return ids_for_path(WalkPath (node))
 
         # Mark node as explored
         explored.add(node.state)
 
         # Add neighbors to frontier
-        for action, state in neighbors_for_person(node.state):
+        for action, state in graph.neighbors(node.state):
             if not frontier.contains_state(state) and state not in explored:
                 child = Node(state=state, parent=node, action=action)
                 if state == target:
-                    return WalkPath (child)
+                    return ids_for_path(WalkPath (child))
                 frontier.add(child)
 
+def landmark_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect the source to the target,
+    using an A* search guided by the landmark oracle's lower bounds.
+
+    People whose best possible path length exceeds the oracle's upper bound are never queued.
+    If no possible path, returns None.
+    """
+    searchStats.clear()
+    searchStats["total"] = 0
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    lower, upper = oracle.bounds(source, target)
+    if lower == math.inf:
+        return None
+
+    heuristic = oracle.heuristic(target)
+
+    # Map each reached person to their best known distance and the (movie, person) step to it
+    distance = {source: 0}
+    parents = {source: None}
+    explored = set()
+    frontier = [(lower, 0, source)]
+
+    while frontier:
+        estimate, cost, person = heapq.heappop(frontier)
+        if person in explored:
+            continue
+        explored.add(person)
+        searchStats["total"] += 1
+
+        if person == target:
+            return ids_for_path(JoinPaths(target, parents, {target: None}))
+
+        cost += 1
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor in explored or distance.get(neighbor, math.inf) <= cost:
+                continue
+            estimate = cost + heuristic(neighbor)
+            if estimate > upper:
+                continue
+            distance[neighbor] = cost
+            parents[neighbor] = (movie, person)
+
+            # Reaching the target at the oracle's lower bound cannot be improved on
+            if neighbor == target and cost == lower:
+                return ids_for_path(JoinPaths(target, parents, {target: None}))
+            heapq.heappush(frontier, (estimate, cost, neighbor))
+
+    return None
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect the source to the target,
+    growing one breadth-first frontier from each end and always expanding the smaller one.
+
+    If no possible path, returns None.
+    """
+    searchStats.clear()
+    searchStats["source"] = 0
+    searchStats["target"] = 0
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # Map each reached person to the (movie, person) step that leads back towards its side's root
+    sourceParents = {source: None}
+    targetParents = {target: None}
+    sourceFrontier = [source]
+    targetFrontier = [target]
+
+    while sourceFrontier and targetFrontier:
+
+        # Expand one full level of the smaller frontier
+        if len(sourceFrontier) <= len(targetFrontier):
+            side, frontier, parents, otherParents = "source", sourceFrontier, sourceParents, targetParents
+        else:
+            side, frontier, parents, otherParents = "target", targetFrontier, targetParents, sourceParents
+
+        nextFrontier = []
+        meeting = None
+        for person in frontier:
+            searchStats[side] += 1
+            for movie, neighbor in graph.neighbors(person):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+                if neighbor in otherParents:
+                    # The first meeting found while expanding a level is on a shortest path
+                    meeting = neighbor
+                    break
+                nextFrontier.append(neighbor)
+            if meeting is not None:
+                break
+
+        if meeting is not None:
+            return ids_for_path(JoinPaths(meeting, sourceParents, targetParents))
+
+        if side == "source":
+            sourceFrontier = nextFrontier
+        else:
+            targetFrontier = nextFrontier
+
+    return None
+
+def JoinPaths(meeting, sourceParents, targetParents):
+    """
+    Returns the ordered path through the person where the two search frontiers met
+    """
+    pathList = []
+    person = meeting
+    while sourceParents[person] is not None:
+        movie, parent = sourceParents[person]
+        pathList.append((movie, person))
+        person = parent
+    pathList.reverse()
+
+    person = meeting
+    while targetParents[person] is not None:
+        movie, parent = targetParents[person]
+        pathList.append((movie, parent))
+        person = parent
+    return pathList
+
 def WalkPath (target):
     """
     Returns an orderd path from the starting point in the search to the final target
@@ -139,15 +574,25 @@ def WalkPath (target):
     pathList = list(reversed(pathList))
     return pathList
 
+def ids_for_path(path):
+    """
+    Converts a path of (movie, person) graph indices into (movie_id, person_id) pairs
+    """
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name, resolving ambiguities as needed.
     """
     person_ids = list(names.get(name.lower(), set()))
+    suggested = False
+    if len(person_ids) == 0:
+        person_ids = suggest_person_ids(name)
+        suggested = True
     if len(person_ids) == 0:
         return None
-    elif len(person_ids) > 1:
-        print(f"Which '{name}'?")
+    elif len(person_ids) > 1 or suggested:
+        print(f"No exact match for '{name}'. Did you mean:" if suggested else f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
             name = person["name"]
@@ -164,15 +609,39 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def suggest_person_ids(name, max_distance=2):
+    """
+    Returns the IMDB ids of the people whose names are the closest typo-tolerant match for a
+    name, or an empty list if nothing is within `max_distance` edits.
+    """
+    matches = graph.names.fuzzy(name, max_distance)
+    if not matches:
+        return []
+    best = matches[0][0]
+    return [
+        graph.person_ids[person]
+        for distance, key, matched in matches if distance == best
+        for person in matched
+    ]
+
+
+def person_ids_with_prefix(prefix, limit=20):
+    """
+    Returns the IMDB ids of up to `limit` people whose names start with a prefix.
+    """
+    person_ids = []
+    for key, matched in graph.names.prefix(prefix, limit):
+        person_ids.extend(graph.person_ids[person] for person in matched)
+    return person_ids[:limit]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
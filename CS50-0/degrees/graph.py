@@ -0,0 +1,574 @@
+import csv
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import zlib
+from array import array
+from collections.abc import Mapping
+
+from nameindex import NAME_ARRAYS, NAME_STRINGS, NameIndex
+
+# Marks the start of a snapshot file written by write_blocks
+SNAPSHOT_MAGIC = b"DEGREES-SNAPSHOT-2\n"
+
+# Arrays and string tables stored in a snapshot, in file order
+SNAPSHOT_ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars"]
+SNAPSHOT_STRINGS = [
+    "person_ids", "person_names", "person_births", "movie_ids", "movie_titles", "movie_years"
+]
+
+# Arrays making up the optional co-star adjacency index
+COSTAR_ARRAYS = ["costar_offsets", "costar_people", "costar_movies"]
+
+# Graph being collapsed by build_costar_index, inherited by forked workers
+chunkGraph = None
+
+
+class Graph():
+    """
+    Compact person-movie graph.
+
+    People and movies are numbered with dense integers in the order they are read, and the
+    person-movie incidence is stored twice as CSR offset/index arrays: the movies of person p
+    are person_movies[person_offsets[p]:person_offsets[p + 1]], and the stars of movie m are
+    movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+
+    People, movies and credits added after loading live in small overlay lists next to the
+    CSR arrays until compact() folds them in. Every change increments `version`.
+    """
+
+    def __init__(self):
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+        self.movie_index = {}
+        self.names = NameIndex()
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("q", [0])
+        self.movie_stars = array("i")
+        self.costar_offsets = None
+        self.costar_people = None
+        self.costar_movies = None
+        self.extra_movies = {}
+        self.extra_stars = {}
+        self.version = 0
+
+    def load_csv(self, directory):
+        """
+        Load people.csv, movies.csv and stars.csv from a directory, replacing any current data.
+        """
+        self.__init__()
+
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.add_person_record(row["id"], row["name"], row["birth"])
+        self.names = NameIndex.build(self.person_names)
+
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.add_movie_record(row["id"], row["title"], row["year"])
+
+        # Collect credits as parallel index arrays, skipping unknown people and movies
+        creditPeople = array("i")
+        creditMovies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = self.person_index.get(row["person_id"])
+                movie = self.movie_index.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                creditPeople.append(person)
+                creditMovies.append(movie)
+
+        self.build_incidence(creditPeople, creditMovies)
+
+    def load_updates(self, directory):
+        """
+        Append the rows of whichever of people.csv, movies.csv and stars.csv exist in a
+        directory to the loaded graph. Credits naming unknown people or movies are skipped.
+
+        Returns the number of people, movies and credits added.
+        """
+        added = [0, 0, 0]
+        path = os.path.join(directory, "people.csv")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if row["id"] not in self.person_index:
+                        self.add_person(row["id"], row["name"], row["birth"])
+                        added[0] += 1
+        path = os.path.join(directory, "movies.csv")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if row["id"] not in self.movie_index:
+                        self.add_movie(row["id"], row["title"], row["year"])
+                        added[1] += 1
+        path = os.path.join(directory, "stars.csv")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        added[2] += self.add_star(row["person_id"], row["movie_id"])
+                    except KeyError:
+                        pass
+        return tuple(added)
+
+    def add_person(self, person_id, name, birth):
+        """
+        Add a person to the loaded graph and return their index.
+        """
+        if person_id in self.person_index:
+            raise ValueError(f"person {person_id} already exists")
+        person = self.add_person_record(person_id, name, birth)
+        self.names.add(name, person)
+        self.changed()
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Add a movie to the loaded graph and return its index.
+        """
+        if movie_id in self.movie_index:
+            raise ValueError(f"movie {movie_id} already exists")
+        movie = self.add_movie_record(movie_id, title, year)
+        self.changed()
+        return movie
+
+    def add_star(self, person_id, movie_id):
+        """
+        Credit a person with starring in a movie. Returns False if the credit already existed.
+
+        Raises KeyError if the person or movie is unknown.
+        """
+        person = self.person_index[person_id]
+        movie = self.movie_index[movie_id]
+        if movie in self.movies_of(person):
+            return False
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_stars.setdefault(movie, []).append(person)
+        self.changed()
+        return True
+
+    def changed(self):
+        """
+        Record a change to the graph, dropping the co-star index it makes stale.
+        """
+        self.version += 1
+        self.costar_offsets = None
+        self.costar_people = None
+        self.costar_movies = None
+
+    def compact(self):
+        """
+        Fold overlay people, movies and credits into freshly built CSR arrays and name index.
+        """
+        creditPeople = array("i")
+        creditMovies = array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_of(person):
+                creditPeople.append(person)
+                creditMovies.append(movie)
+        self.build_incidence(creditPeople, creditMovies)
+        self.extra_movies = {}
+        self.extra_stars = {}
+        self.names = NameIndex.build(self.person_names)
+
+    def add_person_record(self, person_id, name, birth):
+        """
+        Register a person and return their index. Incidence arrays are not touched.
+        """
+        index = len(self.person_ids)
+        self.person_index[person_id] = index
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie_record(self, movie_id, title, year):
+        """
+        Register a movie and return its index. Incidence arrays are not touched.
+        """
+        index = len(self.movie_ids)
+        self.movie_index[movie_id] = index
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def build_incidence(self, creditPeople, creditMovies):
+        """
+        Build both CSR incidence arrays from parallel arrays of (person, movie) credits.
+        Duplicate credits are dropped.
+        """
+        offsets, indices = bucket(creditPeople, creditMovies, len(self.person_ids))
+
+        # Sort and de-duplicate each person's movies, compacting the index array in place
+        compacted = array("q", [0])
+        end = 0
+        for person in range(len(self.person_ids)):
+            row = sorted(set(indices[offsets[person]:offsets[person + 1]]))
+            indices[end:end + len(row)] = array("i", row)
+            end += len(row)
+            compacted.append(end)
+        del indices[end:]
+        self.person_offsets = compacted
+        self.person_movies = indices
+
+        # The movie-side arrays are the transpose of the person-side arrays
+        owners = array("i")
+        for person in range(len(self.person_ids)):
+            owners.extend([person] * (compacted[person + 1] - compacted[person]))
+        self.movie_offsets, self.movie_stars = bucket(indices, owners, len(self.movie_ids))
+
+    def save_snapshot(self, path, key):
+        """
+        Write the graph to a binary snapshot file tagged with `key`.
+        """
+        if self.extra_movies or self.extra_stars or self.names.extra:
+            self.compact()
+        nameArrays, nameStrings = self.names.blocks()
+        write_blocks(
+            path, key,
+            {**{name: getattr(self, name) for name in SNAPSHOT_ARRAYS}, **nameArrays},
+            {**{name: getattr(self, name) for name in SNAPSHOT_STRINGS}, **nameStrings}
+        )
+
+    def load_snapshot(self, path, key):
+        """
+        Replace the graph with the contents of a snapshot file, memory-mapping its arrays.
+
+        Raises ValueError if the snapshot was written for a different key or is malformed.
+        """
+        values = read_blocks(
+            path, key, SNAPSHOT_ARRAYS + SNAPSHOT_STRINGS + NAME_ARRAYS + NAME_STRINGS
+        )
+        if (len(values["person_offsets"]) != len(values["person_ids"]) + 1
+                or len(values["movie_offsets"]) != len(values["movie_ids"]) + 1):
+            raise ValueError("snapshot offsets do not match its tables")
+
+        self.__init__()
+        for name in SNAPSHOT_ARRAYS + SNAPSHOT_STRINGS:
+            setattr(self, name, values[name])
+        self.person_index = {person_id: i for i, person_id in enumerate(self.person_ids)}
+        self.movie_index = {movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+        self.names = NameIndex.from_blocks(values)
+
+    def build_costar_index(self, workers=1):
+        """
+        Build a person-to-person CSR adjacency index holding each co-star once, together with
+        one representative movie they share. The co-stars of person p are
+        costar_people[costar_offsets[p]:costar_offsets[p + 1]], and costar_movies holds the
+        matching movies. Chunks of people are collapsed in parallel when workers > 1.
+        """
+        global chunkGraph
+        size = len(self.person_ids)
+        step = max(1, -(-size // (workers * 4)))
+        chunks = [(start, min(start + step, size)) for start in range(0, size, step)]
+
+        chunkGraph = self
+        try:
+            if workers > 1 and len(chunks) > 1 and "fork" in multiprocessing.get_all_start_methods():
+                with multiprocessing.get_context("fork").Pool(workers) as pool:
+                    results = pool.map(collapse_chunk, chunks)
+            else:
+                results = [collapse_chunk(chunk) for chunk in chunks]
+        finally:
+            chunkGraph = None
+
+        offsets = array("q", [0])
+        people = array("i")
+        movies = array("i")
+        for counts, chunkPeople, chunkMovies in results:
+            for count in counts:
+                offsets.append(offsets[-1] + count)
+            people.extend(chunkPeople)
+            movies.extend(chunkMovies)
+        self.costar_offsets = offsets
+        self.costar_people = people
+        self.costar_movies = movies
+
+    def save_costar_index(self, path, key):
+        """
+        Write the co-star adjacency index to a file tagged with `key`.
+        """
+        write_blocks(path, key, {name: getattr(self, name) for name in COSTAR_ARRAYS}, {})
+
+    def load_costar_index(self, path, key):
+        """
+        Memory-map a co-star adjacency index written by save_costar_index.
+
+        Raises ValueError if the file was written for a different key or is malformed.
+        """
+        values = read_blocks(path, key, COSTAR_ARRAYS)
+        if (len(values["costar_offsets"]) != len(self.person_ids) + 1
+                or len(values["costar_people"]) != len(values["costar_movies"])):
+            raise ValueError("co-star index does not match the graph")
+        for name in COSTAR_ARRAYS:
+            setattr(self, name, values[name])
+
+    def movies_of(self, person):
+        if person + 1 < len(self.person_offsets):
+            movies = self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+        else:
+            movies = ()
+        extra = self.extra_movies.get(person)
+        return movies if extra is None else [*movies, *extra]
+
+    def stars_of(self, movie):
+        if movie + 1 < len(self.movie_offsets):
+            stars = self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+        else:
+            stars = ()
+        extra = self.extra_stars.get(movie)
+        return stars if extra is None else [*stars, *extra]
+
+    def neighbors(self, person):
+        """
+        Yield (movie, person) index pairs for everyone who starred with a given person.
+        """
+        if self.costar_offsets is not None:
+            start = self.costar_offsets[person]
+            end = self.costar_offsets[person + 1]
+            yield from zip(self.costar_movies[start:end], self.costar_people[start:end])
+            return
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def nbytes(self):
+        """
+        Return the number of bytes used by the incidence arrays.
+        """
+        return sum(
+            len(a) * a.itemsize for a in
+            (self.person_offsets, self.person_movies, self.movie_offsets, self.movie_stars)
+        )
+
+    def costar_nbytes(self):
+        """
+        Return the number of bytes used by the co-star adjacency index, or 0 if not built.
+        """
+        if self.costar_offsets is None:
+            return 0
+        return sum(len(getattr(self, name)) * getattr(self, name).itemsize for name in COSTAR_ARRAYS)
+
+
+def collapse_chunk(chunk):
+    """
+    Collapse the co-stars of people start..end-1 of chunkGraph, returning per-person counts and
+    the concatenated co-star and representative movie arrays.
+    """
+    start, end = chunk
+    counts = array("q")
+    people = array("i")
+    movies = array("i")
+    for person in range(start, end):
+        costars = {}
+        for movie in chunkGraph.movies_of(person):
+            for star in chunkGraph.stars_of(movie):
+                if star != person and star not in costars:
+                    costars[star] = movie
+        ordered = sorted(costars)
+        counts.append(len(ordered))
+        people.extend(ordered)
+        movies.extend(costars[star] for star in ordered)
+    return counts, people, movies
+
+
+def write_blocks(path, key, arrays, strings):
+    """
+    Write named arrays and string lists to a binary file tagged with `key`.
+
+    The file is a magic line, a length-prefixed JSON header and then raw 8-byte aligned
+    blocks for every array and NUL-separated string table, so it can be memory-mapped. The
+    header records a CRC-32 of each block.
+    """
+    blocks = []
+    for name, data in arrays.items():
+        kind = data.format if isinstance(data, memoryview) else data.typecode
+        blocks.append((name, kind, len(data), bytes(data)))
+    for name, values in strings.items():
+        if any("\0" in value for value in values):
+            raise ValueError(f"cannot snapshot {name}: value contains NUL")
+        blocks.append((name, "str", len(values), "\0".join(values).encode("utf-8")))
+
+    # Lay out data blocks after the header, each aligned to 8 bytes
+    entries = {}
+    offset = 0
+    for name, kind, count, data in blocks:
+        entries[name] = [kind, count, offset, len(data), zlib.crc32(data)]
+        offset += len(data) + (-len(data) % 8)
+    header = json.dumps({"key": key, "entries": entries}).encode("utf-8")
+    start = len(SNAPSHOT_MAGIC) + 8 + len(header)
+    start += -start % 8
+
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(bytes(start - f.tell()))
+        for name, kind, count, data in blocks:
+            f.write(data)
+            f.write(bytes(-len(data) % 8))
+    os.replace(temporary, path)
+
+
+def read_blocks(path, key, names):
+    """
+    Memory-map a file written by write_blocks and return a dict of its entries, with arrays
+    as memoryviews into the mapping.
+
+    Raises ValueError if the file was written for a different key, is malformed, fails its
+    checksums or lacks any of the given names.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError("not a degrees snapshot")
+        position = len(SNAPSHOT_MAGIC)
+        (headerLength,) = struct.unpack_from("<Q", data, position)
+        position += 8
+        header = json.loads(data[position:position + headerLength])
+        if header["key"] != key:
+            raise ValueError("snapshot is stale")
+        start = position + headerLength
+        start += -start % 8
+
+        view = memoryview(data)
+        values = {}
+        for name, (kind, count, offset, length, checksum) in header["entries"].items():
+            begin = start + offset
+            if begin + length > len(data):
+                raise ValueError("snapshot is truncated")
+            if zlib.crc32(view[begin:begin + length]) != checksum:
+                raise ValueError(f"snapshot entry {name} fails its checksum")
+            if kind == "str":
+                values[name] = data[begin:begin + length].decode("utf-8").split("\0") if count else []
+            else:
+                values[name] = view[begin:begin + length].cast(kind)
+            if len(values[name]) != count:
+                raise ValueError(f"snapshot entry {name} is corrupt")
+        missing = set(names) - set(values)
+        if missing:
+            raise ValueError(f"snapshot is missing {', '.join(sorted(missing))}")
+    except (KeyError, TypeError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"snapshot is corrupt: {e}") from e
+    return values
+
+
+def snapshot_key(directory):
+    """
+    Return a key identifying the current contents of a dataset directory by the size and
+    modification time of its CSV files.
+    """
+    key = []
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        stat = os.stat(os.path.join(directory, filename))
+        key.append([filename, stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def bucket(keys, values, size):
+    """
+    Counting sort of values by key into CSR (offsets, indices) arrays with `size` rows.
+    """
+    offsets = array("q", [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("q", offsets[:-1])
+    indices = array("i", bytes(4 * len(values)))
+    for key, value in zip(keys, values):
+        indices[cursor[key]] = value
+        cursor[key] += 1
+    return offsets, indices
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a Graph in the original `people` dictionary format.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a Graph in the original `movies` dictionary format.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[star] for star in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a Graph in the original `names` dictionary format.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.names.exact(name) if name == name.lower() else ()
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        return self.graph.names.keys()
+
+    def __len__(self):
+        return len(self.graph.names)
+
+    def __contains__(self, name):
+        return name == name.lower() and bool(self.graph.names.exact(name))
@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import struct
+from array import array
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Marks the start of a file written by LandmarkOracle.save
+LANDMARKS_MAGIC = b"DEGREES-LANDMARKS-1\n"
+
+
+class LandmarkOracle():
+    """
+    Degree-of-separation bounds from breadth-first distances to a few landmark people.
+
+    For any landmark L, the triangle inequality gives
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t).
+    """
+
+    def __init__(self, graph, landmarks=(), distances=()):
+        self.graph = graph
+        self.landmarks = list(landmarks)
+        self.distances = list(distances)
+        self.version = graph.version
+
+    def is_current(self):
+        """
+        Return whether the graph is unchanged since the distances were computed.
+        """
+        return self.version == self.graph.version
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Choose the `count` best-connected people as landmarks and run a BFS from each.
+        """
+        oracle = cls(graph)
+        for landmark in pick_landmarks(graph, count):
+            oracle.landmarks.append(landmark)
+            oracle.distances.append(bfs_distances(graph, landmark))
+        return oracle
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the distance between two person indices.
+
+        lower is math.inf if some landmark proves the two people are disconnected, and upper
+        is math.inf if no landmark reaches both of them.
+        """
+        if source == target:
+            return 0, 0
+        lower = 0
+        upper = math.inf
+        for distances in self.distances:
+            s = distances[source]
+            t = distances[target]
+            if s == UNREACHABLE and t == UNREACHABLE:
+                continue
+            if s == UNREACHABLE or t == UNREACHABLE:
+                return math.inf, math.inf
+            lower = max(lower, abs(s - t))
+            upper = min(upper, s + t)
+        return lower, upper
+
+    def lower_bound(self, person, target):
+        """
+        Return an admissible, consistent estimate of the distance from person to target.
+        """
+        lower = 0
+        for distances in self.distances:
+            s = distances[person]
+            t = distances[target]
+            if s != UNREACHABLE and t != UNREACHABLE:
+                difference = s - t if s > t else t - s
+                if difference > lower:
+                    lower = difference
+        return lower
+
+    def heuristic(self, target):
+        """
+        Return a function giving lower_bound(person, target), with the target's distances
+        looked up once and landmarks that cannot reach the target left out.
+        """
+        pairs = [(distances, distances[target]) for distances in self.distances
+                 if distances[target] != UNREACHABLE]
+
+        def estimate(person):
+            lower = 0
+            for distances, t in pairs:
+                difference = distances[person] - t
+                if difference < 0:
+                    difference = -difference
+                if difference > lower:
+                    lower = difference
+            return lower
+
+        return estimate
+
+    def nbytes(self):
+        return sum(len(distances) for distances in self.distances)
+
+    def save(self, path, key):
+        """
+        Write the landmark distance vectors to a file tagged with `key`.
+        """
+        header = json.dumps({"key": key, "landmarks": self.landmarks}).encode("utf-8")
+        temporary = f"{path}.tmp{os.getpid()}"
+        with open(temporary, "wb") as f:
+            f.write(LANDMARKS_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for distances in self.distances:
+                f.write(distances)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, graph, path, key):
+        """
+        Read landmark distance vectors written by save.
+
+        Raises ValueError if the file was written for a different key or is malformed.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            if not data.startswith(LANDMARKS_MAGIC):
+                raise ValueError("not a landmarks file")
+            position = len(LANDMARKS_MAGIC)
+            (headerLength,) = struct.unpack_from("<Q", data, position)
+            position += 8
+            header = json.loads(data[position:position + headerLength])
+            if header["key"] != key:
+                raise ValueError("landmarks file is stale")
+            position += headerLength
+            size = len(graph.person_ids)
+            landmarks = header["landmarks"]
+            if len(data) - position != size * len(landmarks):
+                raise ValueError("landmarks file does not match the graph")
+        except (KeyError, TypeError, struct.error) as e:
+            raise ValueError(f"landmarks file is corrupt: {e}") from e
+        distances = [
+            bytearray(data[position + i * size:position + (i + 1) * size])
+            for i in range(len(landmarks))
+        ]
+        return cls(graph, landmarks, distances)
+
+
+def pick_landmarks(graph, count):
+    """
+    Return the indices of the `count` people with the most co-star incidences.
+    """
+    degree = []
+    for person in range(len(graph.person_ids)):
+        degree.append(sum(len(graph.stars_of(movie)) for movie in graph.movies_of(person)))
+    ranked = sorted(range(len(degree)), key=lambda person: degree[person], reverse=True)
+    return ranked[:count]
+
+
+def bfs_distances(graph, source):
+    """
+    Return a bytearray of hop distances from source to every person, capped below UNREACHABLE.
+    """
+    distances = bytearray([UNREACHABLE]) * len(graph.person_ids)
+    distances[source] = 0
+    seenMovies = bytearray(len(graph.movie_ids))
+    frontier = array("i", [source])
+    depth = 0
+    while frontier and depth < UNREACHABLE - 1:
+        depth += 1
+        nextFrontier = array("i")
+        for person in frontier:
+            for movie in graph.movies_of(person):
+
+                # Every star of a movie is reached at the same depth, so scan each movie once
+                if seenMovies[movie]:
+                    continue
+                seenMovies[movie] = 1
+                for star in graph.stars_of(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = depth
+                        nextFrontier.append(star)
+        frontier = nextFrontier
+    return distances
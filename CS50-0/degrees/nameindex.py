@@ -0,0 +1,235 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+# Arrays and string tables that make up a NameIndex, as stored in a snapshot
+NAME_ARRAYS = ["name_offsets", "name_people", "gram_offsets", "gram_postings", "gram_lengths"]
+NAME_STRINGS = ["name_keys", "gram_keys"]
+
+
+class NameIndex():
+    """
+    Lookup of people by lowercase name, supporting exact, prefix and typo-tolerant matches.
+
+    Distinct lowercase names are kept sorted in name_keys, and the people sharing
+    name_keys[k] are name_people[name_offsets[k]:name_offsets[k + 1]]. For fuzzy matching,
+    each padded trigram gram_keys[g] lists the positions of the names containing it in
+    gram_postings[gram_offsets[g]:gram_offsets[g + 1]], ordered by name length, with the
+    matching lengths in gram_lengths.
+
+    Names added after the index was built are kept in the `extra` dict until it is rebuilt.
+    """
+
+    def __init__(self, name_keys=(), name_offsets=None, name_people=None,
+                 gram_keys=(), gram_offsets=None, gram_postings=None, gram_lengths=None):
+        self.name_keys = list(name_keys)
+        self.name_offsets = name_offsets if name_offsets is not None else array("q", [0])
+        self.name_people = name_people if name_people is not None else array("i")
+        self.gram_keys = list(gram_keys)
+        self.gram_offsets = gram_offsets if gram_offsets is not None else array("q", [0])
+        self.gram_postings = gram_postings if gram_postings is not None else array("i")
+        self.gram_lengths = gram_lengths if gram_lengths is not None else array("i")
+        self.gram_index = {gram: i for i, gram in enumerate(self.gram_keys)}
+        self.extra = {}
+
+    @classmethod
+    def build(cls, names):
+        """
+        Build an index over a list of names, where names[p] is the name of person p.
+        """
+        byKey = {}
+        for person, name in enumerate(names):
+            byKey.setdefault(name.lower(), []).append(person)
+        keys = sorted(byKey)
+
+        offsets = array("q", [0])
+        people = array("i")
+        grams = {}
+        for position, key in enumerate(keys):
+            people.extend(byKey[key])
+            offsets.append(len(people))
+            for gram in trigrams(key):
+                grams.setdefault(gram, array("i")).append(position)
+
+        gramKeys = sorted(grams)
+        gramOffsets = array("q", [0])
+        gramPostings = array("i")
+        gramLengths = array("i")
+        for gram in gramKeys:
+            postings = sorted(grams[gram], key=lambda position: len(keys[position]))
+            gramPostings.extend(postings)
+            gramLengths.extend(len(keys[position]) for position in postings)
+            gramOffsets.append(len(gramPostings))
+        return cls(keys, offsets, people, gramKeys, gramOffsets, gramPostings, gramLengths)
+
+    @classmethod
+    def from_blocks(cls, values):
+        """
+        Rebuild an index from the arrays and string tables returned by blocks().
+        """
+        return cls(*(values[name] for name in
+                     ["name_keys", "name_offsets", "name_people",
+                      "gram_keys", "gram_offsets", "gram_postings", "gram_lengths"]))
+
+    def blocks(self):
+        """
+        Return (arrays, strings) dicts suitable for graph.write_blocks.
+        """
+        arrays = {name: getattr(self, name) for name in NAME_ARRAYS}
+        strings = {name: getattr(self, name) for name in NAME_STRINGS}
+        return arrays, strings
+
+    def add(self, name, person):
+        """
+        Add a person under a name without rebuilding the sorted tables.
+        """
+        key = name.lower()
+        self.extra[key] = self.extra.get(key, ()) + (person,)
+
+    def keys(self):
+        yield from self.name_keys
+        for key in self.extra:
+            if not self.base_exact(key):
+                yield key
+
+    def __len__(self):
+        return len(self.name_keys) + sum(1 for key in self.extra if not self.base_exact(key))
+
+    def people_at(self, position):
+        return tuple(self.name_people[self.name_offsets[position]:self.name_offsets[position + 1]])
+
+    def exact(self, name):
+        """
+        Return the indices of the people whose name matches exactly, ignoring case.
+        """
+        key = name.lower()
+        return self.base_exact(key) + self.extra.get(key, ())
+
+    def base_exact(self, key):
+        position = bisect_left(self.name_keys, key)
+        if position < len(self.name_keys) and self.name_keys[position] == key:
+            return self.people_at(position)
+        return ()
+
+    def prefix(self, prefix, limit=20):
+        """
+        Return up to `limit` (name, people) pairs whose lowercase name starts with prefix.
+        """
+        prefix = prefix.lower()
+        matches = []
+        position = bisect_left(self.name_keys, prefix)
+        while (position < len(self.name_keys) and len(matches) < limit
+               and self.name_keys[position].startswith(prefix)):
+            key = self.name_keys[position]
+            matches.append((key, self.people_at(position) + self.extra.get(key, ())))
+            position += 1
+        for key in sorted(self.extra):
+            if key.startswith(prefix) and not self.base_exact(key) and len(matches) < limit:
+                matches.append((key, self.extra[key]))
+        return sorted(matches)
+
+    def fuzzy(self, name, max_distance=2, limit=10):
+        """
+        Return up to `limit` (distance, name, people) triples for names within `max_distance`
+        edits of name, closest first.
+
+        Only names of a length within reach that share enough of the query's trigrams have
+        their edit distance checked. Queries too short for that to rule anything out check
+        every name of a length within reach.
+        """
+        key = name.lower()
+        queryGrams = trigrams(key)
+        shortest = len(key) - max_distance
+        longest = len(key) + max_distance
+
+        # Each edit changes at most three trigrams, so a close enough name shares at least
+        # `needed` of them; postings are ordered by name length, so names too short or long
+        # to be within reach are skipped
+        needed = len(queryGrams) - 3 * max_distance
+        if needed > 0:
+            shared = Counter()
+            for gram in queryGrams:
+                g = self.gram_index.get(gram)
+                if g is None:
+                    continue
+                start = bisect_left(self.gram_lengths, shortest,
+                                    self.gram_offsets[g], self.gram_offsets[g + 1])
+                end = bisect_right(self.gram_lengths, longest, start, self.gram_offsets[g + 1])
+                shared.update(self.gram_postings[start:end])
+            positions = [position for position, count in shared.items() if count >= needed]
+        else:
+            positions = [position for position, candidate in enumerate(self.name_keys)
+                         if shortest <= len(candidate) <= longest]
+
+        matches = []
+        for position in positions:
+            candidate = self.name_keys[position]
+            distance = edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, candidate,
+                                self.people_at(position) + self.extra.get(candidate, ())))
+        for candidate, people in self.extra.items():
+            if self.base_exact(candidate):
+                continue
+            distance = edit_distance(key, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, candidate, people))
+        matches.sort()
+        return matches[:limit]
+
+
+def trigrams(key):
+    """
+    Return the set of trigrams of a lowercase name padded with spaces at both ends.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the Levenshtein distance between a and b, or limit + 1 once it must exceed limit.
+
+    A shared prefix and suffix are skipped, and only cells within `limit` of the diagonal
+    are filled in, as any path through a cell further out already costs more than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+
+    # Matching characters at either end never add to the distance
+    first = 0
+    shorter = min(len(a), len(b))
+    while first < shorter and a[first] == b[first]:
+        first += 1
+    last = 0
+    while last < shorter - first and a[-1 - last] == b[-1 - last]:
+        last += 1
+    a = a[first:len(a) - last]
+    b = b[first:len(b) - last]
+    if not a or not b:
+        return min(len(a) + len(b), over)
+
+    size = len(b)
+    previous = list(range(size + 1))
+    for i, x in enumerate(a, 1):
+        low = i - limit if i > limit else 1
+        high = i + limit if i + limit < size else size
+        current = [over] * (size + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[low - 1]
+        left = current[low - 1]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (x != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if left + 1 < value:
+                value = left + 1
+            current[j] = left = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
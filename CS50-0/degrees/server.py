@@ -0,0 +1,148 @@
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+# Request paths answered by the query function, mapped to the kind of query they run
+QUERY_PATHS = {"/path": "path", "/degrees": "degrees"}
+
+# Percentiles reported by /stats
+PERCENTILES = [50, 90, 95, 99]
+
+
+class DegreesService():
+    """
+    Answers degrees queries from a pool of forked worker processes, which share the graph
+    loaded by the parent copy-on-write, with an LRU cache of recent results.
+
+    `query` takes a (kind, source, target) tuple and returns a JSON-serializable dict.
+    """
+
+    def __init__(self, query, workers=1, cache_size=1024, window=10000):
+        self.query = query
+        if workers > 0 and "fork" in multiprocessing.get_all_start_methods():
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            self.pool = None
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hits = 0
+
+    async def answer(self, kind, source, target):
+        """
+        Return the result of a query, from the cache if the pair was asked recently.
+        """
+        started = time.perf_counter()
+        self.requests += 1
+        key = (kind, source.lower(), target.lower())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            result = self.cache[key]
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.pool, self.query, (kind, source, target))
+            self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def clear_cache(self):
+        self.cache.clear()
+
+    def stats(self):
+        """
+        Return request counts and latency percentiles over the recent window, in milliseconds.
+        """
+        latencies = sorted(self.latencies)
+        stats = {
+            "requests": self.requests,
+            "cache_hits": self.hits,
+            "cache_size": len(self.cache),
+        }
+        for percentile in PERCENTILES:
+            if latencies:
+                rank = max(0, -(-percentile * len(latencies) // 100) - 1)
+                stats[f"p{percentile}_ms"] = latencies[rank] * 1000
+            else:
+                stats[f"p{percentile}_ms"] = None
+        return stats
+
+    async def handle(self, reader, writer):
+        """
+        Serve one HTTP/1.1 request: GET /path or /degrees with source and target query
+        parameters, or GET /stats.
+        """
+        try:
+            requestLine = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            try:
+                method, target, _ = requestLine.decode("latin-1").split(" ", 2)
+            except ValueError:
+                return await respond(writer, 400, {"error": "malformed request"})
+            if method != "GET":
+                return await respond(writer, 405, {"error": "only GET is supported"})
+
+            url = urlsplit(target)
+            if url.path == "/stats":
+                return await respond(writer, 200, self.stats())
+            if url.path not in QUERY_PATHS:
+                return await respond(writer, 404, {"error": f"unknown path {url.path}"})
+            params = parse_qs(url.query)
+            if "source" not in params or "target" not in params:
+                return await respond(writer, 400, {"error": "source and target are required"})
+            result = await self.answer(
+                QUERY_PATHS[url.path], params["source"][0], params["target"][0]
+            )
+            await respond(writer, 404 if "error" in result else 200, result)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+async def respond(writer, status, body):
+    """
+    Write a JSON response and close the connection.
+    """
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+    payload = json.dumps(body).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {reasons[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + payload
+    )
+    await writer.drain()
+
+
+def serve(query, host="127.0.0.1", port=8050, workers=1, cache_size=1024):
+    """
+    Run the HTTP service until interrupted.
+    """
+    service = DegreesService(query, workers, cache_size)
+
+    async def run():
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Serving on http://{host}:{port}", file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
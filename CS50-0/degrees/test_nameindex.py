@@ -0,0 +1,91 @@
+import random
+import string
+import unittest
+
+from nameindex import NameIndex, edit_distance
+
+# Letters names are drawn from and typos introduce
+LETTERS = string.ascii_lowercase + " "
+
+
+class FuzzyTest(unittest.TestCase):
+    """
+    Checks that NameIndex.fuzzy finds exactly the names a scan of every name would.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        firsts = [random_word(rng, 3, 8) for _ in range(300)]
+        lasts = [random_word(rng, 3, 9) for _ in range(600)]
+        names = [f"{rng.choice(firsts)} {rng.choice(lasts)}" for _ in range(2900)]
+        names += [random_word(rng, 1, 5) for _ in range(100)]
+        cls.names = names
+        cls.index = NameIndex.build(names)
+        cls.queries = [typo(rng, typo(rng, rng.choice(names))) if rng.random() < 0.7
+                       else typo(rng, rng.choice(names)) for _ in range(300)]
+
+    def test_matches_scan(self):
+        keys = sorted({name.lower() for name in self.names})
+        for query in self.queries:
+            # edit_distance itself is checked against a full table in test_edit_distance
+            expected = sorted((edit_distance(query, key, 2), key) for key in keys)
+            expected = [match for match in expected if match[0] <= 2]
+            found = [(distance, key) for distance, key, _ in
+                     self.index.fuzzy(query, limit=len(keys))]
+            self.assertEqual(found, expected, query)
+
+    def test_many_similar_names(self):
+        # Hundreds of names share more trigrams with the query than the one two edits away
+        index = NameIndex.build(["robert smyth t"] + [f"roberq smythy{i}" for i in range(500)])
+        self.assertIn("robert smyth t",
+                      [key for _, key, _ in index.fuzzy("roberq smythyt", limit=1000)])
+
+    def test_people(self):
+        for distance, key, people in self.index.fuzzy(self.queries[0], limit=len(self.names)):
+            self.assertEqual(sorted(people),
+                             [p for p, name in enumerate(self.names) if name.lower() == key])
+
+    def test_edit_distance(self):
+        rng = random.Random(1)
+        for _ in range(5000):
+            a = random_word(rng, 0, 8, "ab")
+            b = random_word(rng, 0, 8, "abc")
+            limit = rng.randint(0, 4)
+            expected = levenshtein(a, b)
+            self.assertEqual(edit_distance(a, b, limit), min(expected, limit + 1), (a, b, limit))
+
+
+def random_word(rng, shortest, longest, letters=string.ascii_lowercase):
+    return "".join(rng.choice(letters) for _ in range(rng.randint(shortest, longest)))
+
+
+def typo(rng, name):
+    """
+    Return name with one letter replaced, inserted or deleted.
+    """
+    i = rng.randrange(len(name) + 1)
+    letter = rng.choice(LETTERS)
+    edit = rng.randrange(3)
+    if edit == 0:
+        return name[:i] + letter + name[i + 1:]
+    if edit == 1:
+        return name[:i] + letter + name[i:]
+    return name[:i] + name[i + 1:]
+
+
+def levenshtein(a, b):
+    """
+    Return the Levenshtein distance between a and b, filling in the whole table.
+    """
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import csv
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import degrees
+from benchmark import generate_dataset
+
+# Share of people and movies in the base dataset; the rest arrive as an update
+BASE_SHARE = 0.8
+
+
+class ApplyUpdatesTest(unittest.TestCase):
+    """
+    Checks that a graph grown by apply_updates answers shortest path queries exactly like a
+    graph loaded from the full dataset, and that landmark distances for the old graph are
+    no longer used.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        full = os.path.join(cls.directory, "full")
+        generate_dataset(full, people=3000, movies=1500, pairs=0, seed=1)
+        cls.base = os.path.join(cls.directory, "base")
+        cls.updates = os.path.join(cls.directory, "updates")
+        split_dataset(full, cls.base, cls.updates)
+
+        degrees.oracle = None
+        degrees.load_data(full, use_snapshot=False)
+        rng = random.Random(0)
+        personIds = [person_id for person_id in sorted(degrees.people)
+                     if degrees.people[person_id]["movies"]]
+        cls.pairs = [(rng.choice(personIds), rng.choice(personIds)) for _ in range(300)]
+        cls.expected = find_paths(cls.pairs)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        degrees.oracle = None
+
+    def test_csv_base(self):
+        degrees.load_data(self.base, use_snapshot=False)
+        degrees.apply_updates(self.updates)
+        self.assertEqual(find_paths(self.pairs), self.expected)
+
+    def test_snapshot_base(self):
+        degrees.load_data(self.base)
+        degrees.load_data(self.base)
+        degrees.apply_updates(self.updates)
+        self.assertEqual(find_paths(self.pairs), self.expected)
+
+    def test_compacted(self):
+        degrees.load_data(self.base, use_snapshot=False)
+        degrees.apply_updates(self.updates)
+        degrees.graph.compact()
+        self.assertEqual(find_paths(self.pairs), self.expected)
+
+    def test_landmarks_dropped(self):
+        degrees.load_data(self.base, use_snapshot=False)
+        degrees.load_landmarks(self.base, 4, use_snapshot=False)
+        self.assertIsNotNone(degrees.fresh_oracle())
+        degrees.apply_updates(self.updates)
+        self.assertIsNone(degrees.fresh_oracle())
+        self.assertEqual(find_paths(self.pairs), self.expected)
+
+
+def split_dataset(source, base, updates):
+    """
+    Split a dataset directory into a base holding the first people and movies with the
+    credits between them, and an update holding everything else.
+    """
+    for directory in (base, updates):
+        os.makedirs(directory, exist_ok=True)
+    kept = {}
+    for filename in ("people.csv", "movies.csv"):
+        rows = read_rows(os.path.join(source, filename))
+        cut = int(len(rows) * BASE_SHARE)
+        kept[filename] = {row["id"] for row in rows[:cut]}
+        write_rows(os.path.join(base, filename), rows[:cut])
+        write_rows(os.path.join(updates, filename), rows[cut:])
+
+    rows = read_rows(os.path.join(source, "stars.csv"))
+    inBase = [row["person_id"] in kept["people.csv"] and row["movie_id"] in kept["movies.csv"]
+              for row in rows]
+    write_rows(os.path.join(base, "stars.csv"), [row for row, keep in zip(rows, inBase) if keep])
+    write_rows(os.path.join(updates, "stars.csv"),
+               [row for row, keep in zip(rows, inBase) if not keep])
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_rows(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def find_paths(pairs):
+    """
+    Return the path find_path gives for each pair, or None if unconnected.
+    """
+    return [degrees.find_path(source, target) for source, target in pairs]
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,9 @@
+import heapq
+import itertools
+import time
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +42,110 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque, with a companion set of states for O(1) membership.
+
+    Like the searches that use it, this assumes a state is only added while not already in
+    the frontier.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.states.discard(node.state)
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.states.discard(node.state)
+        return node
+
+
+class PriorityFrontier():
+    """
+    Frontier that removes the node with the lowest priority first, ties in insertion order.
+
+    Adding a state that is already in the frontier keeps whichever node has the lower
+    priority; superseded heap entries are skipped when removed.
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.frontier = []
+        self.best = {}
+        self.counter = itertools.count()
+
+    def add(self, node):
+        priority = self.priority(node)
+        if node.state in self.best and self.best[node.state] <= priority:
+            return
+        self.best[node.state] = priority
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+
+    def contains_state(self, state):
+        return state in self.best
+
+    def empty(self):
+        return len(self.best) == 0
+
+    def remove(self):
+        while self.frontier:
+            priority, _, node = heapq.heappop(self.frontier)
+            if self.best.get(node.state) == priority:
+                del self.best[node.state]
+                return node
+        raise Exception("empty frontier")
+
+
+def benchmark(sizes=(1000, 2000, 5000)):
+    """
+    Time filling a frontier with `size` states and draining it again, checking membership
+    before every add and once per removal the way the BFS loops do.
+    """
+    kinds = [
+        ("StackFrontier", StackFrontier),
+        ("DequeStackFrontier", DequeStackFrontier),
+        ("QueueFrontier", QueueFrontier),
+        ("DequeQueueFrontier", DequeQueueFrontier),
+        ("PriorityFrontier", lambda: PriorityFrontier(lambda node: node.state)),
+    ]
+    for size in sizes:
+        for name, kind in kinds:
+            frontier = kind()
+            started = time.perf_counter()
+            for state in range(size):
+                if not frontier.contains_state(state):
+                    frontier.add(Node(state=state, parent=None, action=None))
+            while not frontier.empty():
+                frontier.contains_state(size)
+                frontier.remove()
+            elapsed = time.perf_counter() - started
+            print(f"{name:>20} {size:>7} states: {elapsed * 1000:10.2f}ms")
+        print()
+
+
+if __name__ == "__main__":
+    benchmark()
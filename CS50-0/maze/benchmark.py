@@ -0,0 +1,126 @@
+import argparse
+import json
+import random
+import sys
+
+from maze import Maze
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare maze search strategies on open fields.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--density", type=float, default=0.1,
+                        help="fraction of cells that are walls")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--strategies", nargs="+", default=["astar", "jps"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replan", type=int, metavar="CHANGES",
+                        help="instead, toggle this many walls one at a time and compare "
+                             "incremental replanning with solving from scratch")
+    args = parser.parse_args()
+
+    if args.replan:
+        report = run_replanning(args.sizes, args.density, args.replan, args.seed)
+    else:
+        report = run_benchmark(args.sizes, args.density, args.trials, args.strategies, args.seed)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+def open_field(size, density, rng):
+    """
+    Return the text of a square maze with walls scattered at random, with A in the top left
+    corner and B in the bottom right.
+    """
+    rows = []
+    for i in range(size):
+        rows.append("".join("#" if rng.random() < density else " " for _ in range(size)))
+    rows[0] = "A" + rows[0][1:]
+    rows[-1] = rows[-1][:-1] + "B"
+    return "\n".join(rows)
+
+
+def run_benchmark(sizes, density, trials, strategies, seed=0):
+    """
+    Solve `trials` solvable open fields of each size with each strategy, returning the mean
+    states explored and solve time per strategy.
+
+    JPS counts the jump points it expands, not the cells its jumps scan past, so compare
+    its time as well as its states explored with the other strategies.
+    """
+    rng = random.Random(seed)
+    report = {"density": density, "trials": trials, "sizes": {}}
+    for size in sizes:
+        totals = {strategy: {"explored": 0, "seconds": 0.0} for strategy in strategies}
+        solved = 0
+        while solved < trials:
+            text = open_field(size, density, rng)
+            lengths = set()
+            results = {}
+            try:
+                for strategy in strategies:
+                    m = Maze.from_text(text)
+                    m.solve(strategy)
+                    lengths.add(len(m.solution[0]))
+                    results[strategy] = (m.num_explored, m.solve_time)
+            except Exception:
+                continue
+            if len(lengths) != 1 and not {"dfs", "greedy"} & set(strategies):
+                raise Exception(f"strategies disagree on path length: {sorted(lengths)}")
+            for strategy, (explored, seconds) in results.items():
+                totals[strategy]["explored"] += explored
+                totals[strategy]["seconds"] += seconds
+            solved += 1
+        report["sizes"][size] = {
+            strategy: {
+                "mean_explored": total["explored"] / trials,
+                "mean_ms": total["seconds"] / trials * 1000,
+            }
+            for strategy, total in totals.items()
+        }
+    return report
+
+
+def run_replanning(sizes, density, changes, seed=0):
+    """
+    Toggle random walls in an open field of each size, replanning after every change, and
+    return the mean cells expanded and time per change for the incremental planner and for
+    A* from scratch.
+    """
+    rng = random.Random(seed)
+    report = {"density": density, "changes": changes, "sizes": {}}
+    for size in sizes:
+        m = Maze.from_text(open_field(size, density, rng))
+        planner = m.planner()
+        try:
+            planner.plan()
+        except Exception:
+            pass
+        totals = {"incremental": [0, 0.0], "astar": [0, 0.0]}
+        for _ in range(changes):
+            while True:
+                state = (rng.randrange(size), rng.randrange(size))
+                if state not in (m.start, m.goal):
+                    break
+            planner.toggle_wall(state)
+            try:
+                planner.plan()
+            except Exception:
+                pass
+            totals["incremental"][0] += m.num_explored
+            totals["incremental"][1] += m.solve_time
+            try:
+                m.solve("astar")
+            except Exception:
+                pass
+            totals["astar"][0] += m.num_explored
+            totals["astar"][1] += m.solve_time
+        report["sizes"][size] = {
+            name: {"mean_explored": explored / changes, "mean_ms": seconds / changes * 1000}
+            for name, (explored, seconds) in totals.items()
+        }
+    return report
+
+
+if __name__ == "__main__":
+    main()
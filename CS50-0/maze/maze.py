@@ -1,10 +1,21 @@
+import argparse
+import glob
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
+import os
 import sys
+import time
+from collections import deque
 
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
@@ -39,6 +50,118 @@ class QueueFrontier(StackFrontier):
             self.frontier = self.frontier[1:]
             return node
 
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque, with a companion set of states for O(1) membership.
+
+    Like the searches that use it, this assumes a state is only added while not already in
+    the frontier.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.states.discard(node.state)
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.states.discard(node.state)
+        return node
+
+
+class PriorityFrontier():
+    """
+    Frontier that removes the node with the lowest priority first, ties in insertion order.
+
+    Adding a state that is already in the frontier keeps whichever node has the lower
+    priority; superseded heap entries are skipped when removed.
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.frontier = []
+        self.best = {}
+        self.counter = itertools.count()
+
+    def add(self, node):
+        priority = self.priority(node)
+        if node.state in self.best and self.best[node.state] <= priority:
+            return
+        self.best[node.state] = priority
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+
+    def contains_state(self, state):
+        return state in self.best
+
+    def empty(self):
+        return len(self.best) == 0
+
+    def remove(self):
+        while self.frontier:
+            priority, _, node = heapq.heappop(self.frontier)
+            if self.best.get(node.state) == priority:
+                del self.best[node.state]
+                return node
+        raise Exception("empty frontier")
+
+
+# Search strategies accepted by Maze.solve
+STRATEGIES = ["dfs", "bfs", "greedy", "astar", "dijkstra", "jps"]
+
+# Maps every byte of a maze file to 1 for a wall or 0 for an open cell
+WALL_BYTES = bytes(0 if chr(b) in " AB" else 1 for b in range(256))
+
+# Most pixels along each side of a tile written by Maze.output_tiles, keeping each tile's
+# RGBA buffer to about 64 MB
+TILE_PIXELS = 4096
+
+
+class CellSet():
+    """Read-only set-like view of a flag per cell, accepting (row, col) tuples or cell ids."""
+
+    def __init__(self, flags, width):
+        self.flags = flags
+        self.width = width
+
+    def __contains__(self, state):
+        if isinstance(state, tuple):
+            row, col = state
+            if not 0 <= col < self.width:
+                return False
+            state = row * self.width + col
+        return 0 <= state < len(self.flags) and self.flags[state] != 0
+
+    def __iter__(self):
+        for cell, flag in enumerate(self.flags):
+            if flag:
+                yield divmod(cell, self.width)
+
+    def __len__(self):
+        return len(self.flags) - self.flags.count(0)
+
+
 class Maze():
 
     def __init__(self, filename):
@@ -46,6 +169,19 @@ class Maze():
         # Read file and set height and width of maze
         with open(filename) as f:
             contents = f.read()
+        self.load(contents)
+
+
+    @classmethod
+    def from_text(cls, contents):
+        """Creates a maze from text in the same format as a maze file."""
+        maze = cls.__new__(cls)
+        maze.load(contents)
+        return maze
+
+
+    def load(self, contents):
+        """Sets up the maze from the text of a maze file."""
 
         # Validate start and goal
         if contents.count("A") != 1:
@@ -58,41 +194,43 @@ class Maze():
         self.height = len(contents)
         self.width = max(len(line) for line in contents)
 
-        # Keep track of walls
-        self.walls = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                try:
-                    if contents[i][j] == "A":
-                        self.start = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == "B":
-                        self.goal = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == " ":
-                        row.append(False)
-                    else:
-                        row.append(True)
-                except IndexError:
-                    row.append(False)
-            self.walls.append(row)
+        # Keep track of walls as one flag per cell, indexed by row * width + col;
+        # short lines are padded with open cells
+        self.walls = bytearray(self.height * self.width)
+        for i, line in enumerate(contents):
+            if "A" in line:
+                self.start = (i, line.index("A"))
+            if "B" in line:
+                self.goal = (i, line.index("B"))
+            row = line.encode("latin-1", errors="replace").translate(WALL_BYTES)
+            self.walls[i * self.width:i * self.width + len(row)] = row
 
         self.solution = None
 
 
+    def cell(self, state):
+        """Returns the integer id of a (row, col) cell."""
+        return state[0] * self.width + state[1]
+
+
+    def position(self, cell):
+        """Returns the (row, col) of an integer cell id."""
+        return divmod(cell, self.width)
+
+
     def print(self):
-        solution = self.solution[1] if self.solution is not None else None
+        solution = self.solution_mask()
         print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
+        for i in range(self.height):
+            for j in range(self.width):
+                cell = i * self.width + j
+                if self.walls[cell]:
                     print("█", end="")
                 elif (i, j) == self.start:
                     print("A", end="")
                 elif (i, j) == self.goal:
                     print("B", end="")
-                elif solution is not None and (i, j) in solution:
+                elif solution is not None and solution[cell]:
                     print("*", end="")
                 else:
                     print(" ", end="")
@@ -100,41 +238,100 @@ class Maze():
         print()
 
 
+    def solution_mask(self):
+        """Returns a flag per cell marking the solution path, or None if not solved."""
+        if self.solution is None:
+            return None
+        mask = bytearray(self.height * self.width)
+        for state in self.solution[1]:
+            mask[self.cell(state)] = 1
+        return mask
+
+
     def neighbors(self, state):
         row, col = state
-        candidates = [
-            ("up", (row - 1, col)),
-            ("down", (row + 1, col)),
-            ("left", (row, col - 1)),
-            ("right", (row, col + 1))
+        return [
+            (action, self.position(cell))
+            for action, cell in self.cell_neighbors(row * self.width + col)
         ]
 
+
+    def cell_neighbors(self, cell):
+        """Returns (action, cell) pairs for the open cells next to an integer cell id."""
+        width = self.width
+        walls = self.walls
         result = []
-        for action, (r, c) in candidates:
-            if 0 <= r < self.height and 0 <= c < self.width and not self.walls[r][c]:
-                result.append((action, (r, c)))
+        if cell >= width and not walls[cell - width]:
+            result.append(("up", cell - width))
+        if cell + width < len(walls) and not walls[cell + width]:
+            result.append(("down", cell + width))
+        col = cell % width
+        if col > 0 and not walls[cell - 1]:
+            result.append(("left", cell - 1))
+        if col < width - 1 and not walls[cell + 1]:
+            result.append(("right", cell + 1))
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
-
-        # Keep track of number of states explored
+    def manhattan(self, state):
+        """Returns the Manhattan distance from a (row, col) cell or cell id to the goal."""
+        if not isinstance(state, tuple):
+            state = divmod(state, self.width)
+        return abs(state[0] - self.goal[0]) + abs(state[1] - self.goal[1])
+
+
+    def make_frontier(self, strategy, frontier_type=None):
+        """Returns an empty frontier that removes nodes in the order a strategy needs."""
+        if strategy == "dfs":
+            return (frontier_type or DequeStackFrontier)()
+        elif strategy == "bfs":
+            return (frontier_type or DequeQueueFrontier)()
+        elif strategy == "greedy":
+            return PriorityFrontier(lambda node: self.manhattan(node.state))
+        elif strategy == "astar":
+            # Among equally promising nodes, expand the one furthest along its path first;
+            # otherwise ties on open ground are taken in insertion order, much like BFS
+            return PriorityFrontier(
+                lambda node: (node.cost + self.manhattan(node.state), -node.cost)
+            )
+        elif strategy == "dijkstra":
+            return PriorityFrontier(lambda node: node.cost)
+        raise Exception(f"unknown strategy {strategy}")
+
+
+    def solve(self, strategy="dfs", frontier_type=None):
+        """
+        Finds a solution to maze, if one exists.
+
+        `strategy` is one of STRATEGIES. The uninformed "dfs" and "bfs" strategies can be given
+        a different stack or queue frontier class with `frontier_type`. The number of states
+        explored and the time taken are kept in num_explored and solve_time.
+        """
+        if strategy == "jps":
+            return self.solve_jps()
+
+        # Keep track of number of states explored and time taken
         self.num_explored = 0
-
-        # Initialize frontier to just the starting position
-        start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
+        self.strategy = strategy
+        started = time.perf_counter()
+
+        # Initialize frontier to just the starting position, searching over integer cell ids
+        goal = self.cell(self.goal)
+        start = Node(state=self.cell(self.start), parent=None, action=None)
+        frontier = self.make_frontier(strategy, frontier_type)
+        prioritized = isinstance(frontier, PriorityFrontier)
         frontier.add(start)
 
-        # Initialize an empty explored set
-        self.explored = set()
+        # Initialize an empty explored set, one flag per cell
+        self.visited = bytearray(self.height * self.width)
+        self.explored = CellSet(self.visited, self.width)
 
         # Keep looping until solution found
         while True:
 
             # If nothing left in frontier, then no path
             if frontier.empty():
+                self.solve_time = time.perf_counter() - started
                 raise Exception("no solution")
 
             # Choose a node from the frontier
@@ -142,88 +339,493 @@ class Maze():
             self.num_explored += 1
 
             # If node is the goal, then we have a solution
-            if node.state == self.goal:
+            if node.state == goal:
                 actions = []
                 cells = []
                 while node.parent is not None:
                     actions.append(node.action)
-                    cells.append(node.state)
+                    cells.append(self.position(node.state))
                     node = node.parent
                 actions.reverse()
                 cells.reverse()
                 self.solution = (actions, cells)
+                self.solve_time = time.perf_counter() - started
                 return
 
             # Mark node as explored
-            self.explored.add(node.state)
-
-            # Add neighbors to frontier
-            for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
+            self.visited[node.state] = 1
+
+            # Add neighbors to frontier; a priority frontier keeps the cheaper of two nodes
+            for action, state in self.cell_neighbors(node.state):
+                if self.visited[state]:
+                    continue
+                if prioritized or not frontier.contains_state(state):
+                    child = Node(state=state, parent=node, action=action, cost=node.cost + 1)
                     frontier.add(child)
 
 
-    def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
-        cell_size = 50
-        cell_border = 2
-
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
-        )
-        draw = ImageDraw.Draw(img)
+    def planner(self):
+        """Returns an IncrementalPlanner that keeps its search state as walls change."""
+        return IncrementalPlanner(self)
 
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
 
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
+    def solve_jps(self):
+        """
+        Finds a shortest solution with Jump Point Search for 4-connected grids.
 
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
+        Canonical paths move horizontally before vertically, so a vertical run only stops where
+        a horizontal turn is forced by a wall, and a horizontal run stops wherever a vertical
+        run from it would stop. A* then only expands these jump points. num_explored counts
+        the jump points expanded.
+        """
+        self.num_explored = 0
+        self.strategy = "jps"
+        started = time.perf_counter()
+        width = self.width
+        goal = self.cell(self.goal)
+
+        # States are (cell, action that reached it), since the successors of a jump point
+        # depend on whether it was reached horizontally or vertically
+        frontier = PriorityFrontier(
+            lambda node: (node.cost + self.manhattan(node.state[0]), -node.cost)
+        )
+        frontier.add(Node(state=(self.cell(self.start), None), parent=None, action=None))
+        explored = set()
+        self.visited = bytearray(self.height * width)
+        self.explored = CellSet(self.visited, width)
 
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
+        while not frontier.empty():
+            node = frontier.remove()
+            cell, arrival = node.state
+            self.num_explored += 1
 
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
+            if cell == goal:
+                points = []
+                while node is not None:
+                    points.append(node.state[0])
+                    node = node.parent
+                points.reverse()
+                self.solution = self.expand_jumps(points)
+                self.solve_time = time.perf_counter() - started
+                return
 
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
+            explored.add(node.state)
+            self.visited[cell] = 1
+
+            for action in self.jump_directions(cell, arrival):
+                point = self.jump(cell, action, goal)
+                if point is None or (point, action) in explored:
+                    continue
+                distance = abs(point - cell)
+                if action in ("up", "down"):
+                    distance //= width
+                frontier.add(Node(state=(point, action), parent=node, action=action,
+                                  cost=node.cost + distance))
+
+        self.solve_time = time.perf_counter() - started
+        raise Exception("no solution")
+
+
+    def jump_directions(self, cell, arrival):
+        """Returns the directions to jump in from a jump point reached by `arrival`."""
+        if arrival is None:
+            return ["up", "down", "left", "right"]
+        if arrival in ("left", "right"):
+            return [arrival, "up", "down"]
+
+        # Vertical runs continue straight, and only turn where a wall forces it
+        directions = [arrival]
+        behind = cell + self.width if arrival == "up" else cell - self.width
+        col = cell % self.width
+        if col > 0 and not self.walls[cell - 1] and self.walls[behind - 1]:
+            directions.append("left")
+        if col < self.width - 1 and not self.walls[cell + 1] and self.walls[behind + 1]:
+            directions.append("right")
+        return directions
+
+
+    def jump(self, cell, action, goal):
+        """Returns the next jump point from a cell in a direction, or None if there is none."""
+        if action == "up":
+            return self.jump_vertical(cell, -self.width, goal)
+        if action == "down":
+            return self.jump_vertical(cell, self.width, goal)
+        return self.jump_horizontal(cell, -1 if action == "left" else 1, goal)
+
+
+    def jump_vertical(self, cell, step, goal):
+        walls = self.walls
+        width = self.width
+        col = cell % width
+        while True:
+            behind = cell
+            cell += step
+            if cell < 0 or cell >= len(walls) or walls[cell]:
+                return None
+            if cell == goal:
+                return cell
+            if col > 0 and not walls[cell - 1] and walls[behind - 1]:
+                return cell
+            if col < width - 1 and not walls[cell + 1] and walls[behind + 1]:
+                return cell
+
+
+    def jump_horizontal(self, cell, step, goal):
+        walls = self.walls
+        width = self.width
+        col = cell % width
+        while True:
+            cell += step
+            col += step
+            if col < 0 or col >= width or walls[cell]:
+                return None
+            if cell == goal:
+                return cell
+            if (self.jump_vertical(cell, -width, goal) is not None
+                    or self.jump_vertical(cell, width, goal) is not None):
+                return cell
+
+
+    def expand_jumps(self, points):
+        """Returns the (actions, cells) solution for a path of straight runs between cells."""
+        actions = []
+        cells = []
+        for a, b in zip(points, points[1:]):
+            if b // self.width == a // self.width:
+                step, action = (1, "right") if b > a else (-1, "left")
+            else:
+                step, action = (self.width, "down") if b > a else (-self.width, "up")
+            for cell in range(a + step, b + step, step):
+                actions.append(action)
+                cells.append(self.position(cell))
+        return actions, cells
+
+
+    def cell_colors(self, show_solution=True, show_explored=False, rows=None, cols=None,
+                    solution=None):
+        """
+        Returns a numpy array holding the RGBA color of each cell in a block of the grid.
+
+        `rows` and `cols` are ranges of the grid to color, all of it by default. `solution`
+        is the result of solution_mask(), which is called if it is not given.
+        """
+        import numpy as np
+        rows = rows or range(self.height)
+        cols = cols or range(self.width)
+        grid = np.frombuffer(self.walls, dtype=np.uint8).reshape(self.height, self.width)
+        block = (slice(rows.start, rows.stop), slice(cols.start, cols.stop))
+
+        # Later masks take priority, matching the order walls, start, goal, solution, explored
+        colors = np.empty((len(rows), len(cols), 4), dtype=np.uint8)
+        colors[:] = (237, 240, 252, 255)
+        if solution is None:
+            solution = self.solution_mask()
+        if solution is not None and show_explored:
+            visited = np.frombuffer(self.visited, dtype=np.uint8).reshape(grid.shape)
+            colors[visited[block] != 0] = (212, 97, 85, 255)
+        if solution is not None and show_solution:
+            path = np.frombuffer(solution, dtype=np.uint8).reshape(grid.shape)
+            colors[path[block] != 0] = (220, 235, 113, 255)
+        for (i, j), color in ((self.goal, (0, 171, 28, 255)), (self.start, (255, 0, 0, 255))):
+            if i in rows and j in cols:
+                colors[i - rows.start, j - cols.start] = color
+        colors[grid[block] != 0] = (40, 40, 40, 255)
+        return colors
+
+
+    def render(self, show_solution=True, show_explored=False, rows=None, cols=None,
+               cell_size=50, cell_border=2, solution=None):
+        """
+        Returns a numpy RGBA image of a block of the grid, with each cell drawn as a square
+        inside a black border.
+        """
+        import numpy as np
+        colors = self.cell_colors(show_solution, show_explored, rows, cols, solution)
+
+        # Index pixels as (cell row, y in cell, cell column, x in cell), each RGBA color packed
+        # into one uint32, and broadcast each cell's color over the inside of its square
+        height, width = colors.shape[:2]
+        black = np.array([0, 0, 0, 255], dtype=np.uint8).view(np.uint32)[0]
+        pixels = np.full((height, cell_size, width, cell_size), black, dtype=np.uint32)
+        inside = slice(cell_border, cell_size - cell_border + 1)
+        pixels[:, inside, :, inside] = colors.view(np.uint32)[:, None, :, None, 0]
+        return pixels.view(np.uint8).reshape(height * cell_size, width * cell_size, 4)
 
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
 
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
+    def output_image(self, filename, show_solution=True, show_explored=False):
+        from PIL import Image
+        Image.fromarray(self.render(show_solution, show_explored), "RGBA").save(filename)
+
+
+    def output_tiles(self, pattern, tile_cells=None, show_solution=True, show_explored=False,
+                     cell_size=50, cell_border=2):
+        """
+        Saves the maze as a grid of tile images, for mazes too large for a single image.
+
+        Each tile covers up to tile_cells by tile_cells cells, by default as many as fit in
+        TILE_PIXELS pixels, and is saved to pattern.format(row=..., col=...), numbered by
+        tile. Returns the filenames written.
+        """
+        from PIL import Image
+        tile_cells = tile_cells or max(1, TILE_PIXELS // cell_size)
+        solution = self.solution_mask()
+        filenames = []
+        for row in range(0, self.height, tile_cells):
+            for col in range(0, self.width, tile_cells):
+                pixels = self.render(
+                    show_solution, show_explored,
+                    range(row, min(row + tile_cells, self.height)),
+                    range(col, min(col + tile_cells, self.width)),
+                    cell_size, cell_border, solution
                 )
+                filename = pattern.format(row=row // tile_cells, col=col // tile_cells)
+                Image.fromarray(pixels, "RGBA").save(filename)
+                filenames.append(filename)
+        return filenames
+
+
+class IncrementalPlanner():
+    """
+    Lifelong Planning A* over a maze whose walls change between searches.
+
+    g[cell] is the best distance from the start found so far and rhs[cell] the distance
+    implied by its neighbors' g values; only cells where the two disagree are queued. When a
+    wall is toggled, just that cell and its neighbors are updated, so the next plan only
+    re-expands the region the change affects. `expansions` counts the cells expanded by the
+    last call to plan, and `total_expansions` those expanded over the planner's lifetime.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.start = maze.cell(maze.start)
+        self.goal = maze.cell(maze.goal)
+        size = maze.height * maze.width
+        self.g = [math.inf] * size
+        self.rhs = [math.inf] * size
+        self.rhs[self.start] = 0
+        self.queue = []
+        self.queued = {}
+        self.expansions = 0
+        self.total_expansions = 0
+        self.push(self.start)
+
+    def key(self, cell):
+        best = min(self.g[cell], self.rhs[cell])
+        return (best + self.maze.manhattan(cell), best)
+
+    def push(self, cell):
+        key = self.key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.queue, (key, cell))
+
+    def adjacent(self, cell):
+        """Returns the cells next to a cell id, walls included."""
+        width = self.maze.width
+        result = []
+        if cell >= width:
+            result.append(cell - width)
+        if cell + width < len(self.g):
+            result.append(cell + width)
+        col = cell % width
+        if col > 0:
+            result.append(cell - 1)
+        if col < width - 1:
+            result.append(cell + 1)
+        return result
 
-        img.save(filename)
-
-
-#if len(sys.argv) != 2:
-#    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze("maze1.txt")
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+    def update(self, cell):
+        """Recomputes rhs for a cell and queues it if it is inconsistent."""
+        if cell != self.start:
+            if self.maze.walls[cell]:
+                self.rhs[cell] = math.inf
+            else:
+                self.rhs[cell] = min(
+                    (self.g[other] + 1 for other in self.adjacent(cell)
+                     if not self.maze.walls[other]),
+                    default=math.inf
+                )
+        if self.g[cell] != self.rhs[cell]:
+            self.push(cell)
+        else:
+            self.queued.pop(cell, None)
+
+    def set_wall(self, state, wall=True):
+        """Adds or removes the wall at a (row, col) cell."""
+        cell = self.maze.cell(state)
+        if cell in (self.start, self.goal):
+            raise Exception("cannot place a wall on the start or goal")
+        if bool(self.maze.walls[cell]) == wall:
+            return
+        self.maze.walls[cell] = 1 if wall else 0
+        self.update(cell)
+        for other in self.adjacent(cell):
+            self.update(other)
+
+    def toggle_wall(self, state):
+        """Flips a (row, col) cell between wall and open."""
+        self.set_wall(state, not self.maze.walls[self.maze.cell(state)])
+
+    def plan(self):
+        """
+        Brings the search up to date with the current walls and returns the (actions, cells)
+        solution, which is also stored on the maze along with the cells expanded.
+        """
+        maze = self.maze
+        started = time.perf_counter()
+        self.expansions = 0
+        maze.visited = bytearray(len(self.g))
+        maze.explored = CellSet(maze.visited, maze.width)
+
+        goal = self.goal
+        while self.queue:
+            key, cell = self.queue[0]
+            if self.queued.get(cell) != key:
+                heapq.heappop(self.queue)
+                continue
+            if key >= self.key(goal) and self.rhs[goal] == self.g[goal]:
+                break
+            heapq.heappop(self.queue)
+            del self.queued[cell]
+            self.expansions += 1
+            maze.visited[cell] = 1
+
+            # Overconsistent cells settle at their new distance; underconsistent cells are
+            # reset so their neighbors can find another way round
+            if self.g[cell] > self.rhs[cell]:
+                self.g[cell] = self.rhs[cell]
+            else:
+                self.g[cell] = math.inf
+                self.update(cell)
+            for other in self.adjacent(cell):
+                self.update(other)
+
+        self.total_expansions += self.expansions
+        maze.num_explored = self.expansions
+        maze.strategy = "lpa*"
+        maze.solve_time = time.perf_counter() - started
+        if self.g[goal] == math.inf:
+            maze.solution = None
+            raise Exception("no solution")
+
+        # Walk back from the goal through neighbors one step closer to the start
+        actions = []
+        cells = []
+        cell = goal
+        while cell != self.start:
+            for action, other in maze.cell_neighbors(cell):
+                if self.g[other] == self.g[cell] - 1:
+                    break
+            actions.append({"up": "down", "down": "up", "left": "right", "right": "left"}[action])
+            cells.append(maze.position(cell))
+            cell = other
+        actions.reverse()
+        cells.reverse()
+        maze.solution = (actions, cells)
+        return maze.solution
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python maze.py [mazes ...] [options]")
+    parser.add_argument("mazes", nargs="*",
+                        help="maze files, directories of .txt mazes, or glob patterns")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="dfs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes when solving several mazes")
+    parser.add_argument("--images", metavar="DIR",
+                        help="write an image of each solved maze to DIR")
+    parser.add_argument("--explored", action="store_true",
+                        help="shade the explored cells in images")
+    args = parser.parse_args()
+
+    # With no mazes given, walk through solving maze1.txt
+    if not args.mazes:
+        m = Maze("maze1.txt")
+        print("Maze:")
+        m.print()
+        print("Solving...")
+        m.solve(args.strategy)
+        print("States Explored:", m.num_explored)
+        print(f"Solve Time: {m.solve_time * 1000:.3f}ms")
+        print("Solution:")
+        m.print()
+        m.output_image("maze.png", show_explored=True)
+        return
+
+    filenames = maze_files(args.mazes)
+    if not filenames:
+        sys.exit("No maze files found.")
+    if args.images:
+        os.makedirs(args.images, exist_ok=True)
+    solve_files(filenames, args.strategy, args.workers, args.images, args.explored)
+
+
+def maze_files(paths):
+    """Returns the maze files named by a list of files, directories and glob patterns."""
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames.extend(sorted(glob.glob(os.path.join(path, "*.txt"))))
+        elif glob.has_magic(path):
+            filenames.extend(sorted(glob.glob(path)))
+        else:
+            filenames.append(path)
+    return filenames
+
+
+def solve_files(filenames, strategy, workers, images=None, show_explored=False,
+                output=sys.stdout):
+    """
+    Solves every maze file across a pool of worker processes. A summary of each maze is
+    written as a JSON line in completion order, followed by totals on stderr.
+    """
+    tasks = [(filename, strategy, images, show_explored) for filename in filenames]
+
+    started = time.perf_counter()
+    solved = 0
+    errors = 0
+    if workers > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        results = pool.imap_unordered(solve_file, tasks)
+    else:
+        pool = None
+        results = map(solve_file, tasks)
+    try:
+        for result in results:
+            solved += "length" in result
+            errors += "error" in result
+            print(json.dumps(result), file=output, flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - started
+    print(f"Mazes: {len(tasks)} ({solved} solved, {errors} errors) in {elapsed:.3f}s",
+          file=sys.stderr)
+
+
+def solve_file(task):
+    """
+    Solves one maze file in a worker, optionally writing its image there too, and returns a
+    summary dict.
+    """
+    filename, strategy, images, show_explored = task
+    result = {"maze": filename, "strategy": strategy}
+    try:
+        m = Maze(filename)
+        result["cells"] = m.height * m.width
+        m.solve(strategy)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    result["length"] = len(m.solution[0])
+    result["explored"] = m.num_explored
+    result["ms"] = m.solve_time * 1000
+    if images:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        result["image"] = os.path.join(images, f"{name}.png")
+        m.output_image(result["image"], show_explored=show_explored)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import codecs
+import os
+import posixpath
+import re
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from edgelist import write_edge_list
+from engine import LinkGraph
+
+# Bytes read from a page at a time
+CHUNK_SIZE = 1 << 16
+
+# Pages read by a thread per task
+BATCH_SIZE = 256
+
+
+# The double-quoted href attribute of an opening <a> tag, the same pattern crawl uses
+ANCHOR_HREF = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Text at the end of a chunk that more text could turn into a match of ANCHOR_HREF; a
+# quoted href may run past a ">", so a tag is not always over at the next one
+ANCHOR_PREFIX = re.compile(r"<(?:a(?:\s[^>]*|\s+[^>]*?href=\"[^\"]*)?)?\Z")
+
+
+class LinkScanner():
+    """
+    Collects the links crawl would find in UTF-8 bytes fed to it a chunk at a time,
+    carrying any text that could still become a link over to the next chunk, so a page is
+    never held whole.
+    """
+
+    def __init__(self):
+        self.links = []
+        self.pending = ""
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, data, final=False):
+        text = self.pending + self.decoder.decode(data, final)
+        end = 0
+        for match in ANCHOR_HREF.finditer(text):
+            self.links.append(match.group(1))
+            end = match.end()
+        prefix = ANCHOR_PREFIX.search(text, end)
+        self.pending = text[prefix.start():] if prefix else ""
+
+    def close(self):
+        self.feed(b"", final=True)
+        self.pending = ""
+
+
+def crawl_graph(directory, threads=8):
+    """
+    Crawl every .html file under directory, including subdirectories, and return a LinkGraph.
+
+    Pages are named by their path relative to directory, and links are found as crawl finds
+    them, so a flat corpus gives the same graph as crawl. Files are read and parsed by a pool of threads, and each page's links are
+    turned straight into page numbers.
+    """
+    pages = list_pages(directory)
+    index = {page: i for i, page in enumerate(pages)}
+    sources = array("i")
+    targets = array("i")
+    for source, links in enumerate(read_pages(page_links, directory, pages, index, threads)):
+        sources.extend([source] * len(links))
+        targets.extend(links)
+    return LinkGraph.from_edges(pages, np.frombuffer(sources, dtype=np.int32),
+                                np.frombuffer(targets, dtype=np.int32))
+
+
+def crawl_edge_list(directory, output, threads=8):
+    """
+    Crawl a corpus as crawl_graph does, but write its links to an edge list directory as they
+    are found instead of building a graph in memory. Return the number of pages and links.
+    """
+    pages = list_pages(directory)
+    index = {page: i for i, page in enumerate(pages)}
+    links = write_edge_list(output, pages, read_pages(page_links, directory, pages, index, threads))
+    return len(pages), links
+
+
+def list_pages(directory):
+    """
+    Return the sorted paths, relative to directory and separated by /, of its .html files.
+    """
+    pages = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        folder = os.path.relpath(root, directory).replace(os.sep, "/")
+        prefix = "" if folder == "." else folder + "/"
+        pages.extend(prefix + filename for filename in files if filename.endswith(".html"))
+    pages.sort()
+    return pages
+
+
+def read_pages(read, directory, pages, index, threads=8):
+    """
+    Yield read(directory, page, index) for each page in order, computed on a pool of threads.
+    """
+
+    # Hand pages to the threads in batches, since a future per page costs more than a page
+    def read_batch(start):
+        return [read(directory, page, index) for page in pages[start:start + BATCH_SIZE]]
+
+    with ThreadPoolExecutor(threads) as pool:
+        for batch in pool.map(read_batch, range(0, len(pages), BATCH_SIZE)):
+            yield from batch
+
+
+def page_links(directory, page, index):
+    """
+    Return the sorted numbers of the other pages in `index` that a page links to.
+    """
+    links = {index.get(name) for name in link_names(directory, page, index)}
+    links.discard(None)
+    return sorted(links)
+
+
+def link_names(directory, page, index):
+    """
+    Return the set of paths a page links to, other than itself, whether or not they exist.
+    """
+    parser = LinkScanner()
+    with open(os.path.join(directory, page), "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            parser.feed(chunk)
+    parser.close()
+
+    # Links are relative to the directory holding the page; those from pages at the top are
+    # taken as written, as crawl does, and most others need no normalizing either
+    prefix = page[:page.rfind("/") + 1]
+    if not prefix:
+        names = set(parser.links)
+    else:
+        names = set()
+        for link in parser.links:
+            name = prefix + link
+            names.add(name if name in index else posixpath.normpath(name))
+    names.discard(page)
+    return names
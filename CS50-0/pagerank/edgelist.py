@@ -0,0 +1,183 @@
+import argparse
+import os
+import sys
+import time
+from array import array
+
+import numpy as np
+
+DAMPING = 0.85
+TOLERANCE = 1e-8
+
+# Links read from disk at a time, and buffered before writing
+BLOCK_SIZE = 1 << 20
+
+# Files making up an edge list directory: the page names, one per line, and the source and
+# target page numbers of each link as little-endian int32, sorted by source then target
+PAGES = "pages.txt"
+SOURCES = "sources.int32"
+TARGETS = "targets.int32"
+EDGE_TYPE = np.dtype("<i4")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute PageRank over a link graph kept on disk as an edge list."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl = commands.add_parser("crawl", help="crawl a corpus into an edge list directory")
+    crawl.add_argument("corpus")
+    crawl.add_argument("output")
+    crawl.add_argument("--threads", type=int, default=8)
+
+    rank = commands.add_parser("rank", help="compute PageRank over an edge list directory")
+    rank.add_argument("edges")
+    rank.add_argument("--block-size", type=int, default=BLOCK_SIZE,
+                      help="links read from disk at a time")
+    rank.add_argument("--top", type=int, help="print only the highest ranked pages")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "crawl":
+            from crawler import crawl_edge_list
+            started = time.perf_counter()
+            pages, links = crawl_edge_list(args.corpus, args.output, args.threads)
+            print(f"Wrote {pages} pages and {links} links in "
+                  f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+        else:
+            edges = EdgeList(args.edges, args.block_size)
+            started = time.perf_counter()
+            ranks, iterations = stream_ranks(edges, DAMPING, TOLERANCE)
+            print(f"Converged after {iterations} iterations in "
+                  f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+            order = np.argsort(-ranks, kind="stable")[:args.top]
+            pages = edges.page_names()
+            print(f"PageRank Results from Edge List")
+            for page in order.tolist():
+                print(f"  {pages[page]}: {ranks[page]:.4f}")
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+
+
+class EdgeList():
+    """
+    A link graph stored on disk, read through numpy.memmap a block of links at a time so
+    that only arrays with one entry per page are ever held in memory.
+    """
+
+    def __init__(self, directory, block_size=BLOCK_SIZE):
+        self.directory = directory
+        self.block_size = block_size
+        with open(os.path.join(directory, PAGES), encoding="utf-8") as f:
+            self.size = sum(1 for _ in f)
+        sizes = {os.path.getsize(os.path.join(directory, name)) for name in (SOURCES, TARGETS)}
+        if len(sizes) != 1 or sizes.pop() % EDGE_TYPE.itemsize:
+            raise ValueError(f"{directory} has mismatched link files")
+        self.sources = self.open(SOURCES)
+        self.targets = self.open(TARGETS)
+
+        # Sources are sorted, so each block adds to the degrees of a run of pages
+        self.out_degree = np.zeros(self.size, dtype=np.int64)
+        for sources, targets in self.blocks():
+            if len(sources) and (sources[0] < 0 or sources[-1] >= self.size
+                                 or targets.min() < 0 or targets.max() >= self.size):
+                raise ValueError(f"{directory} has links to pages not in {PAGES}")
+            first = sources[0] if len(sources) else 0
+            counts = np.bincount(sources - first)
+            self.out_degree[first:first + len(counts)] += counts
+        self.dangling = self.out_degree == 0
+        self.inverse_degree = np.divide(1, self.out_degree, out=np.zeros(self.size),
+                                        where=~self.dangling)
+
+    def __len__(self):
+        return self.size
+
+    def open(self, name):
+        path = os.path.join(self.directory, name)
+        if not os.path.getsize(path):
+            return np.zeros(0, dtype=EDGE_TYPE)
+        return np.memmap(path, dtype=EDGE_TYPE, mode="r")
+
+    def blocks(self):
+        """
+        Yield (sources, targets) for successive blocks of links.
+        """
+        for start in range(0, len(self.sources), self.block_size):
+            end = start + self.block_size
+            yield (np.asarray(self.sources[start:end], dtype=np.int64),
+                   np.asarray(self.targets[start:end], dtype=np.int64))
+
+    def page_names(self):
+        with open(os.path.join(self.directory, PAGES), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def step(self, rank, damping_factor):
+        """
+        Return the rank after one step of the random surfer, as LinkGraph.step does.
+        """
+        contribution = damping_factor * self.inverse_degree * rank
+        newRank = np.zeros(self.size)
+        for sources, targets in self.blocks():
+            newRank += np.bincount(targets, weights=contribution[sources], minlength=self.size)
+        newRank += (damping_factor * rank[self.dangling].sum() + 1 - damping_factor) / self.size
+        return newRank
+
+
+def write_edge_list(directory, pages, links):
+    """
+    Write an edge list directory for sorted pages, given an iterable yielding the sorted
+    numbers of the pages each page links to, in page order. Links are written a block at a
+    time, so the iterable may be a generator over a corpus too large to hold.
+
+    Returns the number of links written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, PAGES), "w", encoding="utf-8") as f:
+        for page in pages:
+            if "\n" in page or "\r" in page:
+                raise ValueError(f"page name {page!r} contains a line break")
+            f.write(page + "\n")
+
+    count = 0
+    with open(os.path.join(directory, SOURCES), "wb") as sourceFile, \
+            open(os.path.join(directory, TARGETS), "wb") as targetFile:
+
+        def flush(sources, targets):
+            sourceFile.write(np.frombuffer(sources, dtype=np.int32).astype(EDGE_TYPE).tobytes())
+            targetFile.write(np.frombuffer(targets, dtype=np.int32).astype(EDGE_TYPE).tobytes())
+            return len(sources)
+
+        sources = array("i")
+        targets = array("i")
+        for source, pageLinks in enumerate(links):
+            sources.extend([source] * len(pageLinks))
+            targets.extend(pageLinks)
+            if len(sources) >= BLOCK_SIZE:
+                count += flush(sources, targets)
+                sources = array("i")
+                targets = array("i")
+        count += flush(sources, targets)
+    return count
+
+
+def stream_ranks(edges, damping_factor, tolerance=TOLERANCE, max_iterations=1000):
+    """
+    Run power iteration over an EdgeList until the ranks change by at most `tolerance` in
+    total, reading the links from disk once per iteration. Return (rank, iterations).
+    """
+    if not len(edges):
+        raise ValueError(f"{edges.directory} has no pages")
+    rank = np.full(len(edges), 1 / len(edges))
+    for iteration in range(1, max_iterations + 1):
+        newRank = edges.step(rank, damping_factor)
+        rank -= newRank
+        change = np.abs(rank, out=rank).sum()
+        rank = newRank
+        if change <= tolerance:
+            break
+    return rank / rank.sum(), iteration
+
+
+if __name__ == "__main__":
+    main()
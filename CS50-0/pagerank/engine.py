@@ -0,0 +1,420 @@
+import multiprocessing
+import time
+from collections import deque
+
+import numpy as np
+
+# Solvers accepted by solve_ranks
+SOLVERS = ["jacobi", "gauss-seidel", "aitken", "quadratic"]
+
+
+class LinkGraph():
+    """
+    The links of a corpus as a sparse matrix, for computing PageRank with NumPy.
+
+    Pages are numbered in sorted order. The pages linking to page i are
+    sources[offsets[i]:offsets[i + 1]] (compressed sparse rows of the transposed link
+    matrix), and out_degree[j] is the number of pages page j links to. Pages without links
+    are dangling; like transition_model, they spread their rank evenly over every page.
+
+    The pages page j links to, targets[out_offsets[j]:out_offsets[j + 1]], are only built
+    when a sampler first needs them.
+    """
+
+    def __init__(self, pages, offsets, sources, out_degree):
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.offsets = offsets
+        self.sources = sources
+        self.out_degree = out_degree
+        self.dangling = out_degree == 0
+        self.inverse_degree = np.divide(1, out_degree, out=np.zeros(len(out_degree)),
+                                        where=~self.dangling)
+        self.out_offsets = None
+        self.targets = None
+
+        # reduceat needs the start of every non-empty row
+        self.rows = np.flatnonzero(np.diff(offsets))
+        self.starts = offsets[self.rows]
+
+        # SciPy, when installed, multiplies a sparse matrix by a whole block of rank vectors
+        # in one pass
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            self.matrix = None
+        else:
+            self.matrix = csr_matrix(
+                (np.ones(len(sources)), sources, offsets), shape=(len(self.pages), len(self.pages))
+            )
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the matrix from a dict mapping each page to the set of pages it links to.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        sourceList = []
+        targetList = []
+        for page in pages:
+            for link in corpus[page]:
+                if link in index:
+                    sourceList.append(index[page])
+                    targetList.append(index[link])
+        return cls.from_edges(pages, np.array(sourceList, dtype=np.int32),
+                              np.array(targetList, dtype=np.int32))
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build the matrix from parallel arrays of link sources and targets, given as page
+        numbers into pages.
+        """
+        order = np.argsort(targets, kind="stable")
+        counts = np.bincount(targets, minlength=len(pages))
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        outDegree = np.bincount(sources, minlength=len(pages)).astype(np.int64)
+        return cls(pages, offsets, np.ascontiguousarray(sources[order]), outDegree)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def build_out_links(self):
+        """
+        Fill in out_offsets and targets from the in-link rows.
+        """
+        if self.targets is not None:
+            return
+        rowTargets = np.repeat(np.arange(len(self.pages), dtype=np.int32), np.diff(self.offsets))
+        order = np.argsort(self.sources, kind="stable")
+        self.out_offsets = np.zeros(len(self.pages) + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=self.out_offsets[1:])
+        self.targets = rowTargets[order]
+
+    def link_sums(self, contributions):
+        """
+        Return, for every page, the sum of contributions[j] over the pages j linking to it.
+        `contributions` may be a vector or a block with one column per rank vector.
+        """
+        if self.matrix is not None:
+            return self.matrix @ contributions
+        sums = np.zeros(contributions.shape, dtype=np.float64)
+        if len(self.sources):
+            sums[self.rows] = np.add.reduceat(contributions[self.sources], self.starts, axis=0)
+        return sums
+
+    def step(self, rank, damping_factor, teleport=None):
+        """
+        Return the rank after one step of the random surfer from `rank`.
+
+        The surfer teleports, and leaves dangling pages, to a page drawn from `teleport`, or
+        to any page with equal probability if it is None. `rank` and `teleport` may be
+        blocks with one column per rank vector, advanced together.
+        """
+        scale = damping_factor * self.inverse_degree
+        danglingRank = rank[self.dangling].sum(axis=0)
+        newRank = self.link_sums(rank * (scale if rank.ndim == 1 else scale[:, None]))
+        if teleport is None:
+            teleport = 1 / len(self.pages)
+        newRank += (damping_factor * danglingRank + 1 - damping_factor) * teleport
+        return newRank
+
+    def as_dict(self, rank):
+        return {page: float(rank[i]) for i, page in enumerate(self.pages)}
+
+
+def power_iteration(graph, damping_factor, tolerance=1e-8, max_iterations=1000, rank=None,
+                    teleport=None):
+    """
+    Repeat graph.step from a uniform rank, or from `rank` if given, until the L1 change
+    between steps is at most `tolerance` (in every column, for a block of ranks).
+    Return (rank, iterations).
+    """
+    if rank is None:
+        rank = np.full(len(graph), 1 / len(graph))
+    else:
+        rank = np.array(rank, dtype=np.float64)
+    for iteration in range(1, max_iterations + 1):
+        newRank = graph.step(rank, damping_factor, teleport)
+        rank -= newRank
+        change = np.abs(rank, out=rank).sum(axis=0).max()
+        rank = newRank
+        if change <= tolerance:
+            break
+    return rank / rank.sum(axis=0), iteration
+
+
+def solve_ranks(graph, damping_factor, solver="jacobi", tolerance=1e-8, norm=1,
+                max_iterations=1000, period=10):
+    """
+    Compute PageRank with one of SOLVERS until the norm of the change made by a sweep is at
+    most `tolerance`. `norm` is 1, 2 or np.inf. Return (rank, telemetry), where telemetry
+    is a dict holding the solver, the number of sweeps, whether it converged, and the
+    residual and elapsed seconds after each sweep.
+
+    "jacobi" is plain power iteration. "gauss-seidel" updates pages in place, so each page
+    sees the new ranks of the pages before it; it sweeps in Python, one link at a time.
+    "aitken" and "quadratic" are power iteration with Aitken delta-squared or quadratic
+    extrapolation applied every `period` sweeps. If the sweep after an extrapolation changes
+    the rank more than the sweep before it did, the extrapolation is thrown away and not
+    tried again; telemetry counts the extrapolations made and rejected, and the sweep
+    spent on a rejected one.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver}, expected one of {', '.join(SOLVERS)}")
+    if period < 4:
+        raise ValueError("period must be at least 4")
+    telemetry = {"solver": solver, "iterations": 0, "converged": False,
+                 "extrapolated": 0, "rejected": 0, "residuals": [], "seconds": []}
+    started = time.perf_counter()
+    rank = np.full(len(graph), 1 / len(graph))
+    sweep = gauss_seidel_sweep if solver == "gauss-seidel" else LinkGraph.step
+    history = []
+    extrapolating = solver in ("aitken", "quadratic")
+    fallback = None
+    while telemetry["iterations"] < max_iterations:
+        newRank = sweep(graph, rank, damping_factor)
+        residual = float(np.linalg.norm(newRank - rank, ord=norm))
+        telemetry["iterations"] += 1
+        telemetry["residuals"].append(residual)
+        telemetry["seconds"].append(time.perf_counter() - started)
+
+        # Reject an extrapolation that made the next step larger than the one before it,
+        # going back to the plain iterate and extrapolating no more for this graph
+        if fallback is not None and residual > fallback[1]:
+            rank = fallback[0]
+            fallback = None
+            extrapolating = False
+            telemetry["rejected"] += 1
+            continue
+        fallback = None
+        rank = newRank
+        if residual <= tolerance:
+            telemetry["converged"] = True
+            break
+
+        # Extrapolate from the last few iterates, which lie close to the span of the
+        # slowest-decaying eigenvectors once the others have died away
+        if not extrapolating:
+            continue
+        history.append(rank)
+        if len(history) == period:
+            fallback = (rank, residual)
+            if solver == "aitken":
+                rank = aitken_extrapolation(*history[-3:], norm)
+            else:
+                rank = quadratic_extrapolation(*history[-4:])
+            telemetry["extrapolated"] += 1
+            history.clear()
+    return rank / rank.sum(), telemetry
+
+
+def gauss_seidel_sweep(graph, rank, damping_factor):
+    """
+    Return the rank after one Gauss-Seidel sweep, updating pages in order and using each new
+    value as soon as it is computed. The rank held by dangling pages is kept up to date too.
+    """
+    size = len(graph)
+    rank = rank.tolist()
+    offsets = graph.offsets.tolist()
+    sources = graph.sources.tolist()
+    inverse = graph.inverse_degree.tolist()
+    dangling = graph.dangling.tolist()
+    danglingRank = sum(value for value, isDangling in zip(rank, dangling) if isDangling)
+    base = (1 - damping_factor) / size
+    for page in range(size):
+        linked = 0.0
+        for source in sources[offsets[page]:offsets[page + 1]]:
+            linked += rank[source] * inverse[source]
+        if dangling[page]:
+
+            # A dangling page spreads rank to itself too, so solve for its own new value
+            others = danglingRank - rank[page]
+            value = ((damping_factor * (linked + others / size) + base)
+                     / (1 - damping_factor / size))
+            danglingRank = others + value
+        else:
+            value = damping_factor * (linked + danglingRank / size) + base
+        rank[page] = value
+
+    # Sweeps do not keep the total at 1, and rescaling removes the slowly decaying error
+    # along the principal eigenvector
+    rank = np.array(rank)
+    return rank / rank.sum()
+
+
+def aitken_extrapolation(first, second, third, norm=1):
+    """
+    Return the Aitken delta-squared extrapolation of three successive iterates, taking the
+    ratio of the norms of successive steps as the rate at which the error shrinks.
+    """
+    step = third - second
+    rate = np.linalg.norm(step, ord=norm) / np.linalg.norm(second - first, ord=norm)
+    if not 0 < rate < 1:
+        return third
+    return normalized(third + step * rate / (1 - rate))
+
+
+def quadratic_extrapolation(first, second, third, fourth):
+    """
+    Return the quadratic extrapolation of four successive iterates (Kamvar et al., 2003),
+    which removes the components along the two next-largest eigenvectors.
+    """
+    y = np.column_stack([second - first, third - first])
+    gamma, *_ = np.linalg.lstsq(y, -(fourth - first), rcond=None)
+    beta = [gamma[0] + gamma[1] + 1, gamma[1] + 1, 1]
+    return normalized(beta[0] * second + beta[1] * third + beta[2] * fourth)
+
+
+def normalized(rank):
+    """
+    Return a rank vector with negative entries clipped to zero and summing to 1.
+    """
+    rank = np.maximum(rank, 0)
+    return rank / rank.sum()
+
+
+def personalized_ranks(graph, damping_factor, seed_sets, tolerance=1e-8, max_iterations=1000):
+    """
+    Return personalized PageRank for several seed sets at once, as an array with one column
+    per seed set, and the number of iterations taken.
+
+    Each surfer teleports to one of its own seed pages, chosen with equal probability, so
+    the ranks measure closeness to those seeds. With SciPy installed, one sparse matrix
+    times dense block product advances every column per sweep. The iteration count is that
+    of the slowest column.
+    """
+    teleport = np.zeros((len(graph), len(seed_sets)))
+    for column, seeds in enumerate(seed_sets):
+        seeds = list(set(seeds))
+        if not seeds:
+            raise ValueError("each seed set needs at least one page")
+        teleport[seeds, column] = 1 / len(seeds)
+    if graph.matrix is not None:
+        return power_iteration(graph, damping_factor, tolerance, max_iterations,
+                               rank=teleport, teleport=teleport)
+
+    # NumPy alone has no sparse-dense block product, and reducing a block of columns with
+    # reduceat is slower than reducing them one by one, so iterate each column separately
+    ranks = np.zeros_like(teleport)
+    iterations = 0
+    for column in range(teleport.shape[1]):
+        vector = np.ascontiguousarray(teleport[:, column])
+        ranks[:, column], count = power_iteration(
+            graph, damping_factor, tolerance, max_iterations, rank=vector, teleport=vector
+        )
+        iterations = max(iterations, count)
+    return ranks, iterations
+
+
+def push_ranks(graph, damping_factor, seeds, epsilon=1e-6):
+    """
+    Approximate personalized PageRank for one seed set by pushing probability outward from
+    the seeds, touching only the pages near them. Return (estimates, missing): a dict of
+    estimates for the pages reached, and the probability left unpushed.
+
+    Each page keeps a residual of probability not yet pushed; pushing a page banks
+    1 - damping_factor of it and passes the rest along its links, or back to the seeds from
+    a dangling page. Pushing stops once every residual is below epsilon times the page's
+    out-degree. Estimates are never too high, and together they fall short of the true
+    values by exactly `missing`, the sum of the residuals left; on a directed graph that
+    shortfall can land on any page, so no page's estimate is bounded more tightly.
+    """
+    graph.build_out_links()
+    seeds = list(set(seeds))
+    if not seeds:
+        raise ValueError("the seed set needs at least one page")
+    estimates = {}
+    residual = {seed: 1 / len(seeds) for seed in seeds}
+    queue = deque(seeds)
+    queued = set(seeds)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = residual.pop(page)
+        estimates[page] = estimates.get(page, 0) + (1 - damping_factor) * mass
+        degree = graph.out_degree[page]
+        if degree:
+            share = damping_factor * mass / degree
+            targets = graph.targets[graph.out_offsets[page]:graph.out_offsets[page + 1]].tolist()
+        else:
+            share = damping_factor * mass / len(seeds)
+            targets = seeds
+        for target in targets:
+            residual[target] = residual.get(target, 0) + share
+            if target in queued:
+                continue
+            if residual[target] >= epsilon * max(1, graph.out_degree[target]):
+                queue.append(target)
+                queued.add(target)
+    return estimates, sum(residual.values())
+
+
+def sample_ranks(graph, damping_factor, samples, walkers=1000, seed=None, processes=1):
+    """
+    Estimate PageRank by advancing many independent random surfers at once and counting the
+    pages they visit, about `samples` visits in all.
+
+    Each surfer starts at a page chosen uniformly at random and stops at each step with
+    probability 1 - damping_factor, so a walk lasts 1 / (1 - damping_factor) pages on
+    average. Only complete walks are counted, which keeps the estimate unbiased however
+    many surfers share the work: a walk cut short would overweight its starting page.
+
+    Runs with the same seed and number of processes give the same result. With more than
+    one process, the walks are split between workers with independent random streams.
+    Raises ValueError unless samples is positive and damping_factor is below 1.
+    """
+    if samples < 1:
+        raise ValueError("samples must be positive")
+    if not 0 <= damping_factor < 1:
+        raise ValueError("damping_factor must be at least 0 and below 1")
+    graph.build_out_links()
+    walks = max(1, round(samples * (1 - damping_factor)))
+    streams = np.random.SeedSequence(seed).spawn(max(1, min(processes, walks)))
+    shares = [walks // len(streams) + (i < walks % len(streams)) for i in range(len(streams))]
+    tasks = [(graph, damping_factor, share, walkers, stream)
+             for share, stream in zip(shares, streams)]
+    if len(tasks) > 1:
+        with multiprocessing.Pool(len(tasks)) as pool:
+            visits = sum(pool.map(count_visits, tasks))
+    else:
+        visits = count_visits(tasks[0])
+
+    # Like sample_pagerank, credit each visit with where it leads rather than with the page
+    # itself: one exact step of the surfer narrows the spread of the estimate without bias
+    return graph.step(visits / visits.sum(), damping_factor)
+
+
+def count_visits(task):
+    """
+    Return how many times each page is visited by `walks` complete walks, taken by up to
+    `walkers` surfers at a time.
+    """
+    graph, damping_factor, walks, walkers, stream = task
+    rng = np.random.default_rng(stream)
+    size = len(graph.pages)
+    visits = np.zeros(size, dtype=np.int64)
+    position = rng.integers(size, size=max(1, min(walkers, walks)))
+    started = len(position)
+    while len(position):
+        visits += np.bincount(position, minlength=size)
+
+        # Follow a random link with probability damping_factor, or jump to a page chosen
+        # uniformly at random from a page without links; otherwise the walk ends
+        degree = graph.out_degree[position]
+        going = rng.random(len(position)) < damping_factor
+        follow = going & (degree > 0)
+        choice = (rng.random(len(position)) * degree).astype(np.int64)
+        linked = graph.targets[graph.out_offsets[position[follow]] + choice[follow]]
+        newPosition = rng.integers(size, size=len(position))
+        newPosition[follow] = linked
+
+        # Surfers whose walk ended start another while walks remain
+        ended = np.flatnonzero(~going)
+        restarting = min(len(ended), walks - started)
+        started += restarting
+        going[ended[:restarting]] = True
+        position = newPosition[going]
+    return visits
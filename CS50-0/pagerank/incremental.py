@@ -0,0 +1,190 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+from crawler import link_names, list_pages, read_pages
+from engine import LinkGraph, power_iteration
+
+DAMPING = 0.85
+TOLERANCE = 1e-8
+
+# File in the corpus directory holding the previous crawl and ranks
+STATE = ".pagerank.state"
+
+# Ways of telling whether a page changed since the previous crawl
+CHECKS = ["mtime", "hash"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update PageRank for a corpus, re-reading only pages changed since the last run."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--check", choices=CHECKS, default="mtime",
+                        help="detect changed pages by modification time and size, or by content hash")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--no-compare", action="store_true",
+                        help="skip timing a cold start for comparison")
+    parser.add_argument("--ranks", action="store_true", help="print the PageRank of every page")
+    args = parser.parse_args()
+
+    try:
+        graph, rank, report = update_pagerank(
+            args.corpus, DAMPING, TOLERANCE, args.check, args.threads, not args.no_compare
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+    if args.ranks:
+        print(f"PageRank Results from Incremental Iteration")
+        for page, value in sorted(graph.as_dict(rank).items()):
+            print(f"  {page}: {value:.4f}")
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+def update_pagerank(directory, damping_factor=DAMPING, tolerance=TOLERANCE, check="mtime",
+                    threads=8, compare=True):
+    """
+    Crawl a corpus reusing the links of pages unchanged since the state saved by the last
+    run, then run power iteration starting from the previous ranks and save the new state.
+
+    Return (graph, rank, report), where the report counts the pages re-read and gives the
+    iterations and time taken, along with those of a cold start from uniform ranks if
+    `compare` is true. Raises ValueError if the corpus has no pages.
+    """
+    path = os.path.join(directory, STATE)
+    try:
+        previous = load_state(path)
+    except (OSError, ValueError):
+        previous = None
+
+    started = time.perf_counter()
+    pages = list_pages(directory)
+    if not pages:
+        raise ValueError(f"no .html pages in {directory}")
+    index = {page: i for i, page in enumerate(pages)}
+    mtimes = np.zeros(len(pages), dtype=np.int64)
+    sizes = np.zeros(len(pages), dtype=np.int64)
+    for i, page in enumerate(pages):
+        stat = os.stat(os.path.join(directory, page))
+        mtimes[i] = stat.st_mtime_ns
+        sizes[i] = stat.st_size
+    if check == "hash":
+        digests = np.array(list(read_pages(file_digest, directory, pages, index, threads)),
+                           dtype="S16")
+    else:
+        digests = np.zeros(0, dtype="S16")
+
+    # Keep the links of pages that have not changed and re-read the rest
+    oldIndex = {} if previous is None else {page: i for i, page in enumerate(previous["pages"])}
+    pageLinks = [None] * len(pages)
+    for i, page in enumerate(pages):
+        old = oldIndex.get(page)
+        if old is None:
+            continue
+        if check == "hash":
+            unchanged = len(previous["digests"]) and previous["digests"][old] == digests[i]
+        else:
+            unchanged = (previous["mtimes"][old] == mtimes[i]
+                         and previous["sizes"][old] == sizes[i])
+        if unchanged:
+            start, end = previous["link_offsets"][old:old + 2]
+            pageLinks[i] = previous["link_names"][start:end]
+    changed = [page for page, links in zip(pages, pageLinks) if links is None]
+    for page, names in zip(changed, read_pages(link_names, directory, changed, index, threads)):
+        pageLinks[index[page]] = np.array(sorted(names), dtype=str)
+
+    # Look up each distinct link once, dropping links to pages not in the corpus
+    counts = np.array([len(names) for names in pageLinks], dtype=np.int64)
+    names = np.concatenate(pageLinks) if pageLinks else np.zeros(0, dtype=str)
+    distinct, inverse = np.unique(names, return_inverse=True)
+    lookup = np.array([index.get(name, -1) for name in distinct.tolist()], dtype=np.int32)
+    sources = np.repeat(np.arange(len(pages), dtype=np.int32), counts)
+    targets = lookup[inverse.reshape(-1)]
+    found = targets >= 0
+    graph = LinkGraph.from_edges(pages, sources[found], targets[found])
+    crawlSeconds = time.perf_counter() - started
+
+    # Start from the previous ranks, giving new pages an even share
+    warm = np.full(len(pages), 1 / len(pages))
+    if previous is not None:
+        for i, page in enumerate(pages):
+            old = oldIndex.get(page)
+            if old is not None:
+                warm[i] = previous["rank"][old]
+        warm /= warm.sum()
+
+    started = time.perf_counter()
+    rank, iterations = power_iteration(graph, damping_factor, tolerance, rank=warm)
+    report = {
+        "pages": len(pages),
+        "added": sum(page not in oldIndex for page in pages),
+        "removed": len(set(oldIndex) - set(index)),
+        "reread": len(changed),
+        "crawl_seconds": crawlSeconds,
+        "warm": {"iterations": iterations, "seconds": time.perf_counter() - started},
+    }
+    if compare:
+        started = time.perf_counter()
+        _, iterations = power_iteration(graph, damping_factor, tolerance)
+        report["cold"] = {"iterations": iterations, "seconds": time.perf_counter() - started}
+
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    save_state(path, {
+        "pages": np.array(pages, dtype=str),
+        "mtimes": mtimes,
+        "sizes": sizes,
+        "digests": digests,
+        "link_offsets": offsets,
+        "link_names": names,
+        "rank": rank,
+    })
+    return graph, rank, report
+
+
+def file_digest(directory, page, index):
+    """
+    Return a 16-byte BLAKE2 digest of a page's contents.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(os.path.join(directory, page), "rb") as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def save_state(path, arrays):
+    temporary = f"{path}.tmp{os.getpid()}"
+    with open(temporary, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temporary, path)
+
+
+def load_state(path):
+    """
+    Read the arrays written by save_state.
+
+    Raises ValueError if the file is malformed.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {name: data[name] for name in
+                     ["pages", "mtimes", "sizes", "digests", "link_offsets", "link_names", "rank"]}
+    except (KeyError, EOFError, zipfile.BadZipFile) as e:
+        raise ValueError(f"state file is corrupt: {e}") from e
+    if not (len(state["pages"]) == len(state["mtimes"]) == len(state["sizes"])
+            == len(state["rank"]) == len(state["link_offsets"]) - 1):
+        raise ValueError("state file is corrupt")
+    state["pages"] = state["pages"].tolist()
+    return state
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
+import math
 import os
 import random
 import re
 import sys
+import time
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-8
+WALKERS = 1000
 DIRECTORY = "/Users/dsparks/Downloads/pagerank/corpus0"
 
+# Telemetry from the last call to iterate_pagerank: the solver, sweeps made, whether it
+# converged, and the residual and elapsed seconds after each sweep
+iterationStats = {}
+
 
 def main():
     if len(sys.argv) != 2:
@@ -21,6 +29,10 @@ def main():
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    ranks = sparse_pagerank(corpus, DAMPING)
+    print(f"PageRank Results from Sparse Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
 
 
 def crawl(directory):
@@ -50,6 +62,45 @@ def crawl(directory):
     return pages
 
 
+def personalized_pagerank(corpus, damping_factor, seed_sets, tolerance=TOLERANCE):
+    """
+    Return a list of PageRank dicts, one for each set of seed pages in `seed_sets`, where the
+    random surfer teleports only to pages in that set rather than to any page.
+
+    All the rankings are computed together by iterating over a block of rank vectors.
+    """
+    from engine import personalized_ranks
+    graph = link_graph(corpus)
+    seedSets = [[graph.index[page] for page in seeds] for seeds in seed_sets]
+    ranks, _ = personalized_ranks(graph, damping_factor, seedSets, tolerance)
+    return [graph.as_dict(ranks[:, column]) for column in range(len(seedSets))]
+
+
+def local_pagerank(corpus, damping_factor, seeds, epsilon=1e-6):
+    """
+    Return approximate personalized PageRank values for the pages near a set of seed pages,
+    found by pushing probability out from the seeds instead of iterating over every page.
+
+    The values are never too high, and fall short of the true ones by 1 minus their sum in
+    total, which shrinks with epsilon. Pages left out of the dict are counted in that
+    shortfall.
+    """
+    from engine import push_ranks
+    graph = link_graph(corpus)
+    estimates, _ = push_ranks(graph, damping_factor, [graph.index[page] for page in seeds], epsilon)
+    return {graph.pages[page]: value for page, value in estimates.items()}
+
+
+def link_graph(corpus):
+    """
+    Return the engine.LinkGraph for a corpus dict, or the corpus itself if it already is one.
+    """
+    from engine import LinkGraph
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
+
+
 def normalize_probabilities(probabilities):
     """
     Return a normalized distribution so that the sum totals to exactly 1
@@ -126,7 +177,22 @@ def sample_pagerank(corpus, damping_factor, n):
     return normalize_probabilities(visits)
 
 
-def iterate_pagerank(corpus, damping_factor):
+def walk_pagerank(corpus, damping_factor, n, seed=None, walkers=WALKERS, processes=1):
+    """
+    Return PageRank values for each page from about `n` samples, taken by advancing many
+    random surfers together over precomputed link arrays instead of one surfer at a time.
+
+    Passing `seed` makes the result reproducible, and `processes` splits the sampling
+    across worker processes. `corpus` may also be a LinkGraph, such as one returned by
+    crawler.crawl_graph.
+    """
+    from engine import sample_ranks
+    graph = link_graph(corpus)
+    rank = sample_ranks(graph, damping_factor, n, walkers, seed, processes)
+    return graph.as_dict(rank)
+
+
+def iterate_pagerank(corpus, damping_factor, solver=None, tolerance=None, norm=1):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -134,8 +200,25 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    With a solver from engine.SOLVERS, iterate over a sparse link matrix until the `norm`
+    of the change made by a sweep is at most `tolerance` (TOLERANCE by default). Without
+    one, run the original loop, which stops at the same test if `tolerance` is given and
+    otherwise once no page changes by more than .1%. Either way, the residual and time of
+    each sweep are left in iterationStats.
     """
-    
+    global iterationStats
+    if solver is not None:
+        from engine import solve_ranks
+        graph = link_graph(corpus)
+        if tolerance is None:
+            tolerance = TOLERANCE
+        rank, iterationStats = solve_ranks(graph, damping_factor, solver, tolerance, norm)
+        return graph.as_dict(rank)
+    iterationStats = {"solver": "legacy", "iterations": 0, "converged": False,
+                      "residuals": [], "seconds": []}
+    started = time.perf_counter()
+
     # Initialize starting rank as an equal distribution across the number of pages in corpus
     rank = {page: 1/len(corpus) for page in corpus}
 
@@ -143,6 +226,7 @@ def iterate_pagerank(corpus, damping_factor):
     needAnotherIteration = True
     while needAnotherIteration:
         needAnotherIteration = False
+        changes = []
         for page in corpus:
             newRank = 0
 
@@ -163,9 +247,50 @@ def iterate_pagerank(corpus, damping_factor):
             newRank = (newRank * damping_factor) + ((1 - damping_factor)/len(corpus))
             if abs(rank[page] - newRank) > .001:
                 needAnotherIteration = True
+            changes.append(rank[page] - newRank)
             rank[page] = newRank
+        iterationStats["iterations"] += 1
+        iterationStats["residuals"].append(residual_norm(changes, norm))
+        iterationStats["seconds"].append(time.perf_counter() - started)
+        if tolerance is not None:
+            needAnotherIteration = iterationStats["residuals"][-1] > tolerance
+    iterationStats["converged"] = True
     return normalize_probabilities(rank)
 
 
+def residual_norm(changes, norm=1):
+    """
+    Return the 1-, 2- or infinity-norm of a list of changes in rank.
+    """
+    if norm == math.inf:
+        return max(map(abs, changes), default=0.0)
+    return sum(abs(change) ** norm for change in changes) ** (1 / norm)
+
+
+def parallel_pagerank(corpus, damping_factor, processes=None, tolerance=TOLERANCE):
+    """
+    Return the same PageRank values as sparse_pagerank, computed by `processes` worker
+    processes (one per CPU by default) that each update a block of pages.
+    """
+    from parallel import parallel_ranks
+    graph = link_graph(corpus)
+    rank, _ = parallel_ranks(graph, damping_factor, processes or os.cpu_count(), tolerance)
+    return graph.as_dict(rank)
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over a sparse link matrix,
+    built once from the corpus, until the ranks change by at most `tolerance` in total.
+
+    Pages without links spread their rank over all pages, as in transition_model.
+    `corpus` may also be a LinkGraph, such as one returned by crawler.crawl_graph.
+    """
+    from engine import power_iteration
+    graph = link_graph(corpus)
+    rank, _ = power_iteration(graph, damping_factor, tolerance)
+    return graph.as_dict(rank)
+
+
 if __name__ == "__main__":
     main()
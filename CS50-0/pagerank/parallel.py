@@ -0,0 +1,215 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import LinkGraph, power_iteration
+
+DAMPING = 0.85
+TOLERANCE = 1e-8
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time PageRank split across processes and report how well it scales."
+    )
+    parser.add_argument("corpus", nargs="?", help="corpus directory; omit to use a random graph")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages", type=int, default=1000000,
+                        help="pages in the random graph")
+    parser.add_argument("--links", type=int, default=10,
+                        help="mean links per page in the random graph")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.corpus:
+        from crawler import crawl_graph
+        graph = crawl_graph(args.corpus)
+    else:
+        graph = random_graph(args.pages, args.links, args.seed)
+    if not len(graph):
+        sys.exit("no pages to rank")
+    report = scaling_report(graph, DAMPING, TOLERANCE, args.processes)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+def random_graph(pages, links, seed=0):
+    """
+    Return a LinkGraph of numbered pages whose link counts are geometrically distributed
+    with mean `links`, leaving some pages dangling, and whose targets favour low-numbered
+    pages so that a few collect most of the links.
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.geometric(1 / (links + 1), pages) - 1
+    sources = np.repeat(np.arange(pages, dtype=np.int32), counts)
+    targets = (pages * rng.random(len(sources)) ** 2).astype(np.int32)
+    keep = sources != targets
+    names = [f"{page}.html" for page in range(pages)]
+    return LinkGraph.from_edges(names, sources[keep], targets[keep])
+
+
+def scaling_report(graph, damping_factor, tolerance, process_counts):
+    """
+    Run parallel_ranks with each number of processes, returning the time taken, the largest
+    difference from the ranks of engine.power_iteration, and the speedup and efficiency
+    relative to the first count in process_counts (usually 1) assuming it scaled perfectly.
+    """
+    started = time.perf_counter()
+    expected, iterations = power_iteration(graph, damping_factor, tolerance)
+    report = {
+        "pages": len(graph),
+        "links": len(graph.sources),
+        "cpus": os.cpu_count(),
+        "single_process": {"iterations": iterations,
+                           "seconds": time.perf_counter() - started},
+        "processes": {},
+    }
+    baseline = None
+    for processes in process_counts:
+        rank, stats = parallel_ranks(graph, damping_factor, processes, tolerance)
+        if baseline is None:
+            baseline = stats["seconds"] * processes
+        stats["speedup"] = baseline / stats["seconds"]
+        stats["efficiency"] = stats["speedup"] / processes
+        stats["max_difference"] = float(np.abs(rank - expected).max())
+        report["processes"][processes] = stats
+    return report
+
+
+def parallel_ranks(graph, damping_factor, processes, tolerance=TOLERANCE, max_iterations=1000):
+    """
+    Run power iteration with the pages split into `processes` contiguous blocks holding
+    about the same number of in-links. Each worker owns its block's rows of the link matrix
+    and its slice of the rank vector, all in shared memory. Every iteration the workers
+    first publish what their pages pass along each link, then sum what their pages receive.
+
+    Returns (rank, stats), where stats gives the iterations, the seconds spent iterating
+    and the seconds spent starting the workers.
+    """
+    started = time.perf_counter()
+    size = len(graph)
+    processes = max(1, min(processes, size))
+    bounds = np.searchsorted(graph.offsets, np.linspace(0, len(graph.sources), processes + 1))
+    bounds[0], bounds[-1] = 0, size
+    bounds = np.maximum.accumulate(np.minimum(bounds, size))
+
+    arrays = {
+        "offsets": graph.offsets,
+        "sources": graph.sources,
+        "scale": damping_factor * graph.inverse_degree,
+        "dangling": graph.dangling,
+        "rank": np.full(size, 1 / size),
+        "contribution": np.zeros(size),
+        "dangling_rank": np.zeros(processes),
+        "change": np.zeros(processes),
+        "running": np.ones(1, dtype=np.int8),
+    }
+    blocks = {}
+    try:
+        for name, array in arrays.items():
+            blocks[name] = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            arrays[name] = np.ndarray(array.shape, array.dtype, buffer=blocks[name].buf)
+            arrays[name][:] = array
+        del array
+        layout = {name: (blocks[name].name, array.shape, array.dtype.str)
+                  for name, array in arrays.items()}
+
+        # Workers wait on `start` with the parent and on `published` among themselves
+        start = multiprocessing.Barrier(processes + 1)
+        published = multiprocessing.Barrier(processes)
+        workers = [
+            multiprocessing.Process(
+                target=rank_block,
+                args=(layout, worker, int(bounds[worker]), int(bounds[worker + 1]),
+                      damping_factor, start, published),
+            )
+            for worker in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        setup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            for iteration in range(1, max_iterations + 1):
+                start.wait()
+                start.wait()
+                if arrays["change"].sum() <= tolerance:
+                    break
+            arrays["running"][0] = 0
+            start.wait()
+        except multiprocessing.BrokenBarrierError:
+            raise RuntimeError("a PageRank worker failed") from None
+        finally:
+            for worker in workers:
+                worker.join(timeout=1)
+                if worker.is_alive():
+                    worker.terminate()
+        rank = arrays["rank"] / arrays["rank"].sum()
+        seconds = time.perf_counter() - started
+    finally:
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    return rank, {"iterations": iteration, "seconds": seconds, "setup_seconds": setup}
+
+
+def rank_block(layout, worker, first, last, damping_factor, start, published):
+    """
+    Worker loop for parallel_ranks, updating the ranks of pages first to last - 1.
+
+    Between the two waits on `start`, an iteration publishes this block's contributions and
+    its share of the rank held by dangling pages, waits for the other workers to do the
+    same, then replaces the block's ranks and records how much they changed.
+    """
+    blocks = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in layout.items()}
+    try:
+        arrays = {name: np.ndarray(shape, np.dtype(dtype), buffer=blocks[name].buf)
+                  for name, (_, shape, dtype) in layout.items()}
+        size = len(arrays["rank"])
+        rank = arrays["rank"][first:last]
+        scale = arrays["scale"][first:last]
+        dangling = arrays["dangling"][first:last]
+        offsets = arrays["offsets"][first:last + 1]
+        sources = arrays["sources"][offsets[0]:offsets[-1]]
+        contribution = arrays["contribution"]
+
+        # reduceat needs the start of every non-empty row in this block
+        rows = np.flatnonzero(np.diff(offsets))
+        starts = offsets[rows] - offsets[0]
+
+        while True:
+            start.wait()
+            if not arrays["running"][0]:
+                break
+            np.multiply(rank, scale, out=contribution[first:last])
+            arrays["dangling_rank"][worker] = rank[dangling].sum()
+            published.wait()
+
+            newRank = np.zeros(last - first)
+            if len(sources):
+                newRank[rows] = np.add.reduceat(contribution[sources], starts)
+            danglingRank = arrays["dangling_rank"].sum()
+            newRank += (damping_factor * danglingRank + 1 - damping_factor) / size
+            arrays["change"][worker] = np.abs(newRank - rank).sum()
+            rank[:] = newRank
+            start.wait()
+    except BaseException:
+        start.abort()
+        published.abort()
+        raise
+    finally:
+        arrays = rank = scale = dangling = offsets = sources = contribution = None
+        for block in blocks.values():
+            block.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import random
+import re
+import shutil
+import tempfile
+import unittest
+
+import crawler
+from crawler import LinkScanner, crawl_graph
+from pagerank import crawl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Ways of writing a link, only some of which crawl counts
+LINK_FORMS = ['<a href="{}">x</a>', "<a href='{}'>x</a>", '<A HREF="{}">x</A>',
+              '<a href={}>x</a>', '<a class="k" href="./{}">x</a>', '<a href="{}&amp;q">x</a>',
+              '<a data-href="{}">x</a>', '<a\n  title="a > b" href="{}">x</a>']
+
+
+class CrawlGraphTest(unittest.TestCase):
+    """
+    Checks that crawl_graph finds the same links as crawl, however a page splits into chunks.
+    """
+
+    def setUp(self):
+        self.chunk_size = crawler.CHUNK_SIZE
+
+    def tearDown(self):
+        crawler.CHUNK_SIZE = self.chunk_size
+
+    def test_corpora(self):
+        for name in ("corpus0", "corpus1", "corpus2"):
+            directory = os.path.join(HERE, name)
+            self.assertEqual(out_links(crawl_graph(directory)), crawl(directory))
+
+    def test_link_forms(self):
+        rng = random.Random(0)
+        directory = tempfile.mkdtemp()
+        try:
+            for page in range(50):
+                links = "".join(rng.choice(LINK_FORMS).format(f"{rng.randrange(50)}.html")
+                                for _ in range(20))
+                with open(os.path.join(directory, f"{page}.html"), "w", encoding="utf-8") as f:
+                    f.write(f"<html><body><p>ünïcode</p>{links}</body></html>")
+            expected = crawl(directory)
+            for chunkSize in (1, 7, 64, 1 << 16):
+                crawler.CHUNK_SIZE = chunkSize
+                self.assertEqual(out_links(crawl_graph(directory)), expected)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_scanner_chunks(self):
+        rng = random.Random(1)
+        pieces = ['<a href="', '"', ">", "<", "<a ", " ", "\n", "href=", "x.html", "é",
+                  '<a href="y.html">', '<a class="c" href="z.html">']
+        for _ in range(2000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+            data = text.encode("utf-8")
+            scanner = LinkScanner()
+            position = 0
+            while position < len(data):
+                step = rng.randint(1, 5)
+                scanner.feed(data[position:position + step])
+                position += step
+            scanner.close()
+            self.assertEqual(scanner.links,
+                             re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", text), text)
+
+
+def out_links(graph):
+    """
+    Return a LinkGraph as a corpus dict mapping each page to the set of pages it links to.
+    """
+    graph.build_out_links()
+    return {
+        page: {graph.pages[target]
+               for target in graph.targets[graph.out_offsets[i]:graph.out_offsets[i + 1]]}
+        for i, page in enumerate(graph.pages)
+    }
+
+
+if __name__ == "__main__":
+    unittest.main()
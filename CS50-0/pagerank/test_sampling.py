@@ -0,0 +1,51 @@
+import os
+import unittest
+
+import numpy as np
+
+from engine import power_iteration, sample_ranks
+from pagerank import DAMPING, crawl, link_graph
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus2")
+
+
+class SampleRanksTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.graph = link_graph(crawl(CORPUS))
+        cls.expected, _ = power_iteration(cls.graph, DAMPING, 1e-12)
+
+    def mean_error(self, samples, walkers=1000, seeds=20):
+        """
+        Return the largest per-page error of sample_ranks, averaged over several seeds.
+        """
+        return np.mean([
+            np.abs(sample_ranks(self.graph, DAMPING, samples, walkers, seed) - self.expected).max()
+            for seed in range(seeds)
+        ])
+
+    def test_error_shrinks_with_samples(self):
+        errors = [self.mean_error(samples) for samples in (1000, 10000, 100000)]
+        self.assertLess(errors[1], errors[0])
+        self.assertLess(errors[2], errors[1])
+        self.assertLess(errors[2], 0.002)
+
+    def test_walkers_do_not_bias_estimate(self):
+        for walkers in (10, 1000, 100000):
+            mean = np.mean([sample_ranks(self.graph, DAMPING, 10000, walkers, seed)
+                            for seed in range(100)], axis=0)
+            self.assertLess(np.abs(mean - self.expected).max(), 0.002, walkers)
+
+    def test_processes_give_valid_distribution(self):
+        rank = sample_ranks(self.graph, DAMPING, 10000, seed=1, processes=3)
+        self.assertAlmostEqual(rank.sum(), 1)
+        self.assertLess(np.abs(rank - self.expected).max(), 0.02)
+
+    def test_rejects_no_samples(self):
+        with self.assertRaises(ValueError):
+            sample_ranks(self.graph, DAMPING, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()